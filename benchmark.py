@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from session import create_session_local
+from schemas import DAILY_REPORT_SUFFIXES
+from hdfs_utils import list_files, delete_path
+from manifest import ManifestEntry
+from serving_tables import build_serving_tables
+from synthetic_data import generate
+from data_ingestion import (
+    create_tables, new_run_id, read_stage, clean_stage, country_stage, covid_data_stage, publish
+)
+
+STAGES = ["read", "clean", "country_dimension", "mapping", "write", "serving"]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def timed(timings, stage, function):
+    start = time.perf_counter()
+    result = function()
+    timings[stage] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_scale(spark, data_dir, scale, args):
+    """ Generates the workload for one scale and times each ingestion stage on it, as a full load.
+        Every stage writes its output to the run's staging directory, as in data_ingestion.py,
+        so the next stage is timed on its own.
+    """
+    rows, file_count = generate(data_dir, countries=args.countries, provinces=args.provinces * scale, days=args.days)
+
+    # Every scale starts from empty tables
+    spark.sql("DROP DATABASE IF EXISTS database_name CASCADE")
+    create_tables(spark)
+    entries = [
+        ManifestEntry(file_info.path, file_info.size, file_info.mtime, None)
+        for file_info in list_files(spark, data_dir, DAILY_REPORT_SUFFIXES)
+    ]
+    staging_dir = os.path.join(data_dir, "staging")
+    delete_path(spark, staging_dir)
+
+    timings = {}
+    raw_df, _ = timed(timings, "read", lambda: read_stage(spark, staging_dir, entries))
+    cleaned_df = timed(timings, "clean", lambda: clean_stage(spark, staging_dir, raw_df, new_run_id()))
+    country_df = timed(timings, "country_dimension", lambda: country_stage(spark, staging_dir, cleaned_df))
+    covid_data_df = timed(
+        timings, "mapping", lambda: covid_data_stage(spark, staging_dir, cleaned_df, country_df, incremental=False)
+    )
+    timed(timings, "write", lambda: publish(spark, country_df, covid_data_df, full_load=True))
+    timed(timings, "serving", lambda: build_serving_tables(spark))
+
+    return {
+        "scale": scale,
+        "rows": rows,
+        "files": file_count,
+        "stages": timings,
+        "total": round(sum(timings.values()), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each ingestion stage on synthetic data in Spark local mode")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--countries", type=int, default=20)
+    parser.add_argument("--provinces", type=int, default=5, help="reporting regions per country at scale 1")
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--work-dir", help="where data, warehouse and metastore go (default: a temporary directory)")
+    parser.add_argument("--output", help="results file (default: benchmark_results/<commit>.json)")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix="athena_benchmark_"))
+    output = args.output or os.path.join("benchmark_results", f"{commit}.json")
+
+    spark = create_session_local(os.path.join(work_dir, "warehouse"), os.path.join(work_dir, "metastore_db"))
+    results = []
+    for scale in args.scales:
+        result = run_scale(spark, os.path.join(work_dir, f"data_{scale}x"), scale, args)
+        print(f"{scale}x: {result['rows']} rows, {result['total']}s", result["stages"])
+        results.append(result)
+
+    report = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(),
+        "spark_version": spark.version,
+        "workload": {"countries": args.countries, "provinces": args.provinces, "days": args.days},
+        "stages": STAGES,
+        "results": results,
+    }
+    spark.stop()
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
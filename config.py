@@ -7,4 +7,59 @@ load_dotenv(dotenv_path=".env_dev")
 HADOOP_FILE_PATH = os.getenv("HADOOP_FILE_PATH")
 HIVE_METASTORE_URI = os.getenv("HIVE_METASTORE_URI")
 
-BASE_URL = os.getenv("BASE_URL")
\ No newline at end of file
+BASE_URL = os.getenv("BASE_URL")
+
+# Where the Hive tables are stored, and how the API queries them: "spark" (Spark SQL through the metastore)
+# or "arrow" (PyArrow reading the Parquet files under WAREHOUSE_PATH directly, no JVM needed)
+WAREHOUSE_PATH = os.getenv("WAREHOUSE_PATH", "/user/hive/warehouse")
+QUERY_BACKEND = os.getenv("QUERY_BACKEND", "spark")
+
+# API server: worker threads of the WSGI server started by run.py, and the Spark FAIR scheduler pools
+# (one per endpoint, with weights) its queries run in
+API_THREADS = int(os.getenv("API_THREADS", "8"))
+SPARK_SCHEDULER_POOLS_FILE = os.getenv(
+    "SPARK_SCHEDULER_POOLS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fairscheduler.xml")
+)
+
+# API result cache: how many results it keeps, and how often (seconds) it checks the published data version
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+DATA_VERSION_POLL_SECONDS = float(os.getenv("DATA_VERSION_POLL_SECONDS", "5"))
+
+# /updates event streams: how many clients may be subscribed at once (each one holds a server thread),
+# and how often (seconds) an idle stream gets a keepalive
+UPDATES_MAX_CLIENTS = int(os.getenv("UPDATES_MAX_CLIENTS", "4"))
+UPDATES_KEEPALIVE_SECONDS = float(os.getenv("UPDATES_KEEPALIVE_SECONDS", "15"))
+
+# Streaming ingestion: where the stream keeps its progress, and how often it looks for new files
+STREAM_CHECKPOINT_PATH = os.getenv("STREAM_CHECKPOINT_PATH", "/user/athena/checkpoints/covid_data")
+STREAM_TRIGGER_INTERVAL = os.getenv("STREAM_TRIGGER_INTERVAL", "1 minute")
+
+# Local directory the ingestion job writes its per-run data quality reports to
+QUALITY_REPORT_DIR = os.getenv("QUALITY_REPORT_DIR", "quality_reports")
+
+# Ingestion reads the files in batches of INGEST_BATCH_FILES, INGEST_PARALLELISM batches at a time,
+# and stages the raw rows of every batch under STAGING_PATH/<run id> until the run is done
+INGEST_BATCH_FILES = int(os.getenv("INGEST_BATCH_FILES", "50"))
+INGEST_PARALLELISM = int(os.getenv("INGEST_PARALLELISM", "4"))
+STAGING_PATH = os.getenv("STAGING_PATH", "/user/athena/staging")
+
+
+class Config:
+    # Settings shared by the ingestion job and the Flask app
+    HADOOP_FILE_PATH = HADOOP_FILE_PATH
+    HIVE_METASTORE_URI = HIVE_METASTORE_URI
+    BASE_URL = BASE_URL
+    WAREHOUSE_PATH = WAREHOUSE_PATH
+    QUERY_BACKEND = QUERY_BACKEND
+    RESULT_CACHE_SIZE = RESULT_CACHE_SIZE
+    DATA_VERSION_POLL_SECONDS = DATA_VERSION_POLL_SECONDS
+    API_THREADS = API_THREADS
+    SPARK_SCHEDULER_POOLS_FILE = SPARK_SCHEDULER_POOLS_FILE
+    UPDATES_MAX_CLIENTS = UPDATES_MAX_CLIENTS
+    UPDATES_KEEPALIVE_SECONDS = UPDATES_KEEPALIVE_SECONDS
+    STREAM_CHECKPOINT_PATH = STREAM_CHECKPOINT_PATH
+    STREAM_TRIGGER_INTERVAL = STREAM_TRIGGER_INTERVAL
+    QUALITY_REPORT_DIR = QUALITY_REPORT_DIR
+    INGEST_BATCH_FILES = INGEST_BATCH_FILES
+    INGEST_PARALLELISM = INGEST_PARALLELISM
+    STAGING_PATH = STAGING_PATH
@@ -1,3 +1,16 @@
+# Hive tables
+COUNTRY_TABLE = "database_name.Country"
+COVID_DATA_TABLE = "database_name.CovidData"
+
+# Serving tables, rebuilt by the ingestion job so the API does not aggregate CovidData per request
+GLOBAL_TOTALS_TABLE = "database_name.GlobalTotals"
+COUNTRY_TOTALS_TABLE = "database_name.CountryTotals"
+COUNTRY_CFR_TABLE = "database_name.CountryCaseFatality"
+DAILY_TOTALS_TABLE = "database_name.DailyTotals"
+
+# One row naming the data version the serving tables were last rebuilt from, see publish_data_version
+DATA_VERSION_TABLE = "database_name.DataVersion"
+
 COUNTRIES = {
     "Afghanistan": {"latitude": 33.9391, "longitude": 67.7100},
     "Albania": {"latitude": 41.1533, "longitude": 20.1683},
@@ -9,40 +9,19 @@ pn.extension('plotly')
 
 # Data:
 
-# Access total cases endpoint
-response = requests.get(f"{BASE_URL}/total_cases")
+# Access the dashboard bundle endpoint: the payloads of total_cases, total_cases_by_country,
+# case_fatality_ratio, total_cases_over_time and news in one response, tables given column by column
+response = requests.get(f"{BASE_URL}/dashboard_bundle")
 if response.status_code == 200:
-    global_json = response.json()
+    bundle = response.json()
+    global_json = bundle['total_cases']
+    country_totals_frame = pd.DataFrame(bundle['total_cases_by_country'])
+    world_map_df = pd.DataFrame(bundle['case_fatality_ratio'])
+    trends_df = pd.DataFrame(bundle['total_cases_over_time'])
+    trends_df['date'] = pd.to_datetime(trends_df['date'])
+    news_data = bundle['news']
 else:
-    print("Failed to fetch total cases:", response.status_code)
-
-# Access total cases by country endpoint
-response = requests.get(f"{BASE_URL}/total_cases_by_country")
-if response.status_code == 200:
-    country_totals_json = response.json()
-else:
-    print("Failed to fetch total cases by country:", response.status_code)
-
-# Access case fatality ratio endpoint
-response = requests.get(f"{BASE_URL}/case_fatality_ratio")
-if response.status_code == 200:
-    world_map_json = response.json()
-else:
-    print("Failed to fetch case fatality ratio:", response.status_code)
-
-# Access total cases over time endpoint
-response = requests.get(f"{BASE_URL}/total_cases_over_time")
-if response.status_code == 200:
-    trends_json = response.json()
-else:
-    print("Failed to fetch total cases over time:", response.status_code)
-
-# Access news endpoint
-response = requests.get(f"{BASE_URL}/news")
-if response.status_code == 200:
-    news_data = response.json()
-else:
-    print("Failed to fetch news:", response.status_code)
+    print("Failed to fetch dashboard bundle:", response.status_code)
 
 #____________________________________________________________________________________
 # Data:
@@ -52,7 +31,8 @@ global_json['total_recovered'] = global_json['total_cases'] - global_json['total
 
 #____________________________________________________________________________________
 # country-specific data
-country_totals_df = pd.DataFrame(country_totals_json)
+# One column per country, one row per metric
+country_totals_df = country_totals_frame.set_index('country').T
 country_totals_df.loc['total_recovered'] = (
     country_totals_df.loc['total_cases']
     - country_totals_df.loc['total_active']
@@ -61,21 +41,18 @@ country_totals_df.loc['total_recovered'] = (
 
 #____________________________________________________________________________________
 # Data with each country's location and case-death ratio
-# world_map_json = get_case_fatality_ratio()
-world_map_df = pd.DataFrame(world_map_json)
 world_map_df_sorted = world_map_df.sort_values(by='case_fatality_ratio', ascending=False)
 
 #____________________________________________________________________________________
 # Data of total cases, deaths, and recovered over time:
-# trend_json = get_total_cases_over_time()
-# trends_df = pd.DataFrame(trend_json)
-trends_df = pd.DataFrame(trends_json)
+# trends_df has one row per date, loaded above
 
 #____________________________________________________________________________________
 # Heat map data
-country_totals_data = {key:list(numbers.values()) for key, numbers in country_totals_json.items()}
-country_heat_data = pd.DataFrame(country_totals_data,
-                                 index=["Total Cases", "Total Deaths", "Total Recovered", "Total Active"]).T
+country_heat_data = country_totals_frame.set_index('country')[
+    ['total_cases', 'total_deaths', 'total_recovered', 'total_active']
+]
+country_heat_data.columns = ["Total Cases", "Total Deaths", "Total Recovered", "Total Active"]
 #____________________________________________________________________________________
 articles = news_data["articles"]
 
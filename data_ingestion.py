@@ -1,116 +1,581 @@
-from pyspark.sql import SparkSession
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from pyspark import StorageLevel
+from pyspark.sql import SparkSession, Window
 from session import create_session_hive
 from config import Config
-from pyspark.sql.functions import col, lit, to_date, monotonically_increasing_id, when
-from pyspark.sql.types import IntegerType, FloatType
-
-# Initialize SparkSession with Hive Support
-spark = create_session_hive()
-
-# Load CSV Files into a DataFrame
-covid_raw_df = spark.read.csv(Config.HADOOP_FILE_PATH, header=True, inferSchema=True)
-
-# Data Preprocessing
-# 1. Handle missing values in critical columns by filling with appropriate default values.
-covid_raw_df = covid_raw_df.fillna({
-    "Case_Fatality_Ratio": 0.0,
-    "Confirmed": 0,
-    "Deaths": 0,
-    "Recovered": 0,
-    "Active": 0,
-    "Incident_Rate": 0.0
-})
-
-# 2. Handle missing or malformed country names by dropping rows where 'Country_Region' is null.
-covid_raw_df = covid_raw_df.filter(covid_raw_df["Country_Region"].isNotNull())
-
-# 3. Handle duplicate rows based on key columns (e.g., Country_Region, Last_Update).
-covid_raw_df = covid_raw_df.dropDuplicates(["Country_Region", "Last_Update"])
-
-# Process Country Data
-country_df = covid_raw_df.select(
-    col("Country_Region").alias("Name"),
-    col("Lat").alias("latitude").cast(FloatType()),
-    col("Long_").alias("longitude").cast(FloatType())
-).distinct()
-
-# Handle missing latitude or longitude by setting them to 0 (or another placeholder)
-country_df = country_df.fillna({"latitude": 0.0, "longitude": 0.0})
-
-# Add Unique IDs to Countries
-country_df = country_df.withColumn("id", monotonically_increasing_id().cast(IntegerType()))
-
-# Create Country Table in Hive
-spark.sql("""
-    CREATE TABLE IF NOT EXISTS Country (
-        id INT,
-        Name STRING,
-        latitude FLOAT,
-        longitude FLOAT
+from schemas import DAILY_REPORT_SUFFIXES, read_daily_reports
+from hdfs_utils import FileInfo, list_files, path_exists, delete_path
+from manifest import ManifestEntry, ENTRY_SCHEMA, create_manifest_table, load_manifest, pending_files, record_files
+from serving_tables import create_serving_tables, build_serving_tables, publish_data_version
+from quality import flag_daily_reports, cleaned_rows, quality_report, write_quality_report
+from constants import COUNTRY_TABLE, COVID_DATA_TABLE
+from pyspark.sql.functions import col, lit, row_number, avg, broadcast, expr, lag, coalesce, date_sub, date_add
+from pyspark.sql.functions import max as spark_max, min as spark_min
+from pyspark.sql.types import IntegerType
+
+COVID_DATA_STAGING_TABLE = "database_name.CovidData_staging"
+
+# Columns of CovidData in table order
+COVID_DATA_COLUMNS = [
+    "country_id", "Province_State", "Admin2", "Case_Fatality_Ratio", "Confirmed", "Deaths", "Recovered", "Active",
+    "Incident_Rate", "New_Confirmed", "New_Deaths", "New_Recovered", "date"
+]
+
+# A location reports cumulative values; rows of CovidData are identified by location and date
+LOCATION_KEYS = ["country_id", "Province_State", "Admin2"]
+COVID_DATA_KEYS = LOCATION_KEYS + ["date"]
+
+# Daily changes are computed from these cumulative columns
+DELTA_COLUMNS = {"Confirmed": "New_Confirmed", "Deaths": "New_Deaths", "Recovered": "New_Recovered"}
+
+# How far back an incremental run first looks for the previous report of a location (locations that did not
+# report in that window are then looked up in the older partitions), and how far past the dates it loads it
+# looks for later reports whose daily change it alters
+DELTA_LOOKBACK_DAYS = 30
+
+# Parquet writer options of CovidData: a bloom filter on country_id next to the min/max statistics
+# Parquet keeps per row group, so readers filtering on one country can skip the row groups without it.
+# Parquet does not write the bloom filter of a column chunk whose pages are all dictionary encoded, which is
+# always the case for the few hundred country ids, so country_id is written without a dictionary.
+COVID_DATA_OPTIONS = {
+    "parquet.bloom.filter.enabled#country_id": "true",
+    "parquet.bloom.filter.expected.ndv#country_id": "300",
+    "parquet.enable.dictionary#country_id": "false",
+}
+
+
+# Schema of the binaryFile source, which the stream in run_stream lists the landing directory with
+BINARY_FILE_SCHEMA = "path STRING, modificationTime TIMESTAMP, length BIGINT, content BINARY"
+
+
+def new_run_id():
+    return datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+
+def stage_batch(spark, paths, batch_path):
+    """ Reads a batch of files and writes their raw rows to batch_path as Parquet.
+        When the batch fails, its files are retried one at a time so that a malformed file only fails itself.
+        Returns (staged batch paths, {failed file: error message})
+    """
+    try:
+        read_daily_reports(spark, paths).write.mode("overwrite").parquet(batch_path)
+        return [batch_path], {}
+    except Exception as error:
+        # Whatever the failed job left behind must not be picked up with the staged batches
+        delete_path(spark, batch_path)
+        if len(paths) == 1:
+            # First line of the message, or the exception type when the message is empty
+            return [], {paths[0]: (str(error).strip().splitlines() or [type(error).__name__])[0]}
+
+    staged, failed = [], {}
+    for index, path in enumerate(paths):
+        file_staged, file_failed = stage_batch(spark, [path], f"{batch_path}-{index}")
+        staged += file_staged
+        failed.update(file_failed)
+    return staged, failed
+
+
+def read_in_batches(spark, paths, staging_dir):
+    """ Reads the files in independent batches, each one its own Spark job, INGEST_PARALLELISM at a time.
+        A slow file only holds up its own batch, and a file that cannot be read is left out of the run
+        instead of failing it. The raw rows (tagged with their source_file) are staged under staging_dir.
+        Returns (raw_df, {failed file: error message}); raw_df is None when no file could be read.
+    """
+    batch_size = Config.INGEST_BATCH_FILES
+    batches = [paths[start:start + batch_size] for start in range(0, len(paths), batch_size)]
+
+    staged, failed = [], {}
+    with ThreadPoolExecutor(max_workers=Config.INGEST_PARALLELISM) as executor:
+        futures = [
+            executor.submit(stage_batch, spark, batch, f"{staging_dir}/batch-{index}")
+            for index, batch in enumerate(batches)
+        ]
+        for future in futures:
+            batch_staged, batch_failed = future.result()
+            staged += batch_staged
+            failed.update(batch_failed)
+
+    for path, message in sorted(failed.items()):
+        print(f"Skipping {path}: {message}")
+    if not staged:
+        return None, failed
+    return spark.read.option("recursiveFileLookup", "true").parquet(staging_dir), failed
+
+
+def clean_daily_reports(spark, covid_raw_df, run_id):
+    """ Runs the data quality stage (see quality.py) and writes its report.
+        The flagged rows are cached: counting the report is the only pass over the source files,
+        and the cleaned rows are served from the cache afterwards.
+        Returns (cleaned_df, flagged_df); unpersist flagged_df once the run is done.
+    """
+    flagged_df = flag_daily_reports(covid_raw_df).persist(StorageLevel.MEMORY_AND_DISK)
+    report_path = write_quality_report(spark, run_id, quality_report(flagged_df), Config.QUALITY_REPORT_DIR)
+    print(f"Data quality report written to {report_path}")
+    return cleaned_rows(flagged_df), flagged_df
+
+
+def select_countries(covid_raw_df):
+    # Process Country Data
+    # One row per country, placed at the average of its reported coordinates
+    country_df = covid_raw_df.groupBy(col("Country_Region").alias("Name")).agg(
+        avg("Lat").cast("float").alias("latitude"),
+        avg("Long_").cast("float").alias("longitude")
     )
-""")
-
-# Populate Country Table
-country_df.write.mode("overwrite").insertInto("Country")
-
-# Create a Broadcast Variable for Country Mapping
-country_mapping = {row["Name"]: row["id"] for row in country_df.collect()}
-broadcast_country_map = spark.sparkContext.broadcast(country_mapping)
-
-# Process CovidData
-covid_data_df = covid_raw_df.select(
-    lit(None).cast(IntegerType()).alias("country_id"),  # Placeholder for country_id
-    to_date(col("Last_Update"), "yyyy-MM-dd HH:mm:ss").alias("date"),
-    col("Case_Fatality_Ratio").cast(FloatType()),
-    col("Confirmed").cast(IntegerType()),
-    col("Deaths").cast(IntegerType()),
-    col("Recovered").cast(IntegerType()),
-    col("Active").cast(IntegerType()),
-    col("Incident_Rate").cast(FloatType()),
-    col("Country_Region")
-)
-
-# 4. Handle negative or implausible values in numerical columns by replacing them with default values.
-covid_data_df = covid_data_df.withColumn(
-    "Confirmed", when(col("Confirmed") < 0, 0).otherwise(col("Confirmed"))
-).withColumn(
-    "Deaths", when(col("Deaths") < 0, 0).otherwise(col("Deaths"))
-).withColumn(
-    "Recovered", when(col("Recovered") < 0, 0).otherwise(col("Recovered"))
-).withColumn(
-    "Active", when(col("Active") < 0, 0).otherwise(col("Active"))
-).withColumn(
-    "Incident_Rate", when(col("Incident_Rate") < 0, 0.0).otherwise(col("Incident_Rate"))
-)
-
-# Map Country Names to IDs
-def map_country_id(country_name):
-    return broadcast_country_map.value.get(country_name, None)
-
-map_country_udf = spark.udf.register("map_country_id", map_country_id, IntegerType())
-covid_data_df = covid_data_df.withColumn(
-    "country_id", map_country_udf(col("Country_Region"))
-).drop("Country_Region")
-
-# Handle rows with missing or invalid country IDs by setting them to None (or another placeholder)
-covid_data_df = covid_data_df.fillna({"country_id": None})
-
-# Create CovidData Table in Hive
-spark.sql("""
-    CREATE TABLE IF NOT EXISTS database_name.CovidData (
-        country_id INT,
-        date DATE,
-        Case_Fatality_Ratio FLOAT,
-        Confirmed INT,
-        Deaths INT,
-        Recovered INT,
-        Active INT,
-        Incident_Rate FLOAT
+
+    # Handle missing latitude or longitude by setting them to 0 (or another placeholder)
+    return country_df.fillna({"latitude": 0.0, "longitude": 0.0})
+
+
+def create_tables(spark):
+    spark.sql("CREATE DATABASE IF NOT EXISTS database_name")
+
+    # Create Country Table in Hive
+    spark.sql(f"""
+        CREATE TABLE IF NOT EXISTS {COUNTRY_TABLE} (
+            id INT,
+            Name STRING,
+            latitude FLOAT,
+            longitude FLOAT
+        )
+    """)
+
+    # Create CovidData Table in Hive
+    # Stored as Parquet and partitioned by date, so time-bounded queries only read the days they need.
+    # The partition column has to come last, insertInto matches columns by position.
+    options = ", ".join(f"'{key}' '{value}'" for key, value in COVID_DATA_OPTIONS.items())
+    spark.sql(f"""
+        CREATE TABLE IF NOT EXISTS {COVID_DATA_TABLE} (
+            country_id INT,
+            Province_State STRING,
+            Admin2 STRING,
+            Case_Fatality_Ratio FLOAT,
+            Confirmed INT,
+            Deaths INT,
+            Recovered INT,
+            Active INT,
+            Incident_Rate FLOAT,
+            New_Confirmed INT,
+            New_Deaths INT,
+            New_Recovered INT,
+            date DATE
+        )
+        USING PARQUET
+        OPTIONS ({options})
+        PARTITIONED BY (date)
+    """)
+    # A table created with older writer options gets the current ones; its files pick them up when rewritten
+    spark.sql(f"ALTER TABLE {COVID_DATA_TABLE} SET SERDEPROPERTIES ({options})")
+
+    columns = spark.catalog.listColumns(COVID_DATA_TABLE)
+    if [column.name for column in columns] != COVID_DATA_COLUMNS or \
+            [column.name for column in columns if column.isPartition] != ["date"]:
+        raise RuntimeError(
+            f"{COVID_DATA_TABLE} was created with an older layout, drop it and run a full load to recreate it"
+        )
+
+    create_manifest_table(spark)
+    create_serving_tables(spark)
+
+
+def country_dimension(spark, covid_raw_df):
+    """ Returns the Country table with the countries that are not in it yet added,
+        numbered in name order after the current highest id.
+        Existing rows are kept as they are, so a country keeps its id across runs
+        and the country_id values already in CovidData stay valid.
+    """
+    existing_df = spark.table(COUNTRY_TABLE)
+    new_country_df = select_countries(covid_raw_df).join(existing_df.select("Name"), "Name", "left_anti")
+
+    max_id = existing_df.agg(spark_max("id")).first()[0]
+    max_id = -1 if max_id is None else max_id
+    new_country_df = new_country_df.withColumn(
+        "id", (lit(max_id) + row_number().over(Window.orderBy("Name"))).cast(IntegerType())
+    )
+
+    return existing_df.unionByName(new_country_df.select("id", "Name", "latitude", "longitude"))
+
+
+def build_covid_data(spark, covid_raw_df, country_df, incremental=False):
+    # Process CovidData
+    covid_data_df = covid_raw_df.select(
+        col("Province_State"),
+        col("Admin2"),
+        col("Case_Fatality_Ratio"),
+        col("Confirmed"),
+        col("Deaths"),
+        col("Recovered"),
+        col("Active"),
+        col("Incident_Rate"),
+        col("date"),
+        col("Country_Region")
+    )
+
+    # Map Country Names to IDs
+    # The Country table is small, so it is broadcast and joined in the JVM instead of going through a Python UDF.
+    # Rows with an unknown country keep a null country_id.
+    country_ids_df = country_df.select(col("Name").alias("Country_Region"), col("id").alias("country_id"))
+    covid_data_df = covid_data_df.join(broadcast(country_ids_df), "Country_Region", "left")
+
+    covid_data_df = covid_data_df.drop("Country_Region")
+
+    # Incremental runs compute the first daily change of a location from its last loaded report
+    previous_df = previous_reports(spark, covid_data_df) if incremental else None
+    covid_data_df = add_daily_deltas(covid_data_df, previous_df)
+    return covid_data_df.select(*COVID_DATA_COLUMNS)
+
+
+def add_daily_deltas(covid_data_df, previous_df=None):
+    """ Adds New_Confirmed, New_Deaths and New_Recovered: the cumulative value of a report minus the
+        previous report of the same location. previous_df holds rows that are already loaded, so the
+        first new report of a location is compared with its last loaded one.
+        A location without an earlier report gets its cumulative value as the change.
+    """
+    rows_df = covid_data_df.withColumn("is_new", lit(True))
+    if previous_df is not None:
+        rows_df = rows_df.unionByName(
+            previous_df.select(*covid_data_df.columns).withColumn("is_new", lit(False))
+        )
+
+    by_location = Window.partitionBy(*LOCATION_KEYS).orderBy("date")
+    for column_name, delta_name in DELTA_COLUMNS.items():
+        previous_value = coalesce(lag(column_name).over(by_location), lit(0))
+        rows_df = rows_df.withColumn(delta_name, (col(column_name) - previous_value).cast("int"))
+
+    return rows_df.where(col("is_new")).drop("is_new")
+
+
+def previous_reports(spark, covid_data_df):
+    """ Returns the latest loaded report of every location in covid_data_df before its first date
+    """
+    first_date = covid_data_df.agg(spark_min("date")).first()[0]
+    if first_date is None:
+        return None
+    return reports_before(spark, first_date, covid_data_df.select(*LOCATION_KEYS).distinct())
+
+
+def latest_reports(reports_df):
+    # The latest of the given reports of every location
+    latest_first = Window.partitionBy(*LOCATION_KEYS).orderBy(col("date").desc())
+    return (
+        reports_df
+        .withColumn("report_rank", row_number().over(latest_first))
+        .where(col("report_rank") == 1)
+        .drop("report_rank")
+    )
+
+
+def reports_before(spark, first_date, locations_df):
+    """ Returns the latest loaded report before first_date of every location in locations_df, however old it is,
+        so that incremental runs compute the same daily changes as a full load.
+        Most locations report every day and are found in the last DELTA_LOOKBACK_DAYS; only the locations
+        that did not report in that window are looked up in the older partitions.
+    """
+    loaded_df = spark.table(COVID_DATA_TABLE).where(col("date") < lit(first_date))
+    window_start = date_sub(lit(first_date), DELTA_LOOKBACK_DAYS)
+
+    recent_df = latest_reports(
+        loaded_df.where(col("date") >= window_start).join(locations_df, LOCATION_KEYS, "left_semi")
     )
-""")
+    missing_df = locations_df.join(recent_df.select(*LOCATION_KEYS), LOCATION_KEYS, "left_anti")
+    if missing_df.isEmpty():
+        return recent_df
+
+    older_df = latest_reports(loaded_df.where(col("date") < window_start).join(missing_df, LOCATION_KEYS, "left_semi"))
+    return recent_df.unionByName(older_df)
+
+
+def clustered(covid_data_df):
+    # One file per date partition, with the rows of a country next to each other so that
+    # row group statistics and bloom filters on country_id can skip most of the file
+    return covid_data_df.repartition("date").sortWithinPartitions("date", "country_id")
+
+
+def merge_into_covid_data(spark, covid_data_df, replace_existing):
+    """ Merges newly ingested rows into the date partitions of CovidData they touch.
+        New files only add the (location, date) rows that are not loaded yet.
+        Changed files replace the rows they cover.
+        Partitions the new rows do not touch are neither read nor rewritten, except the ones holding the next
+        report of one of their locations when its daily change has to be corrected (see with_recomputed_deltas).
+    """
+    covid_data_df = covid_data_df.select(*spark.table(COVID_DATA_TABLE).columns)
+    touched_dates = [row["date"] for row in covid_data_df.select("date").distinct().collect()]
+
+    # Filtering on literal dates lets Spark prune the partitions that are not touched
+    touched_condition = col("date").isin([date for date in touched_dates if date is not None])
+    if None in touched_dates:
+        touched_condition = touched_condition | col("date").isNull()
+    existing_df = spark.table(COVID_DATA_TABLE).where(touched_condition)
+
+    if replace_existing:
+        incoming_keys_df = covid_data_df.select(*COVID_DATA_KEYS).distinct()
+        merged_df = existing_df.join(incoming_keys_df, COVID_DATA_KEYS, "left_anti").unionByName(covid_data_df)
+    else:
+        existing_keys_df = existing_df.select(*COVID_DATA_KEYS).distinct()
+        merged_df = existing_df.unionByName(covid_data_df.join(existing_keys_df, COVID_DATA_KEYS, "left_anti"))
+
+    rows_df = with_recomputed_deltas(spark, merged_df, covid_data_df, touched_dates)
+
+    # Spark cannot overwrite partitions it is reading from, so the merge result is staged first.
+    # With dynamic partition overwrite only the partitions present in the staged rows are replaced.
+    rows_df.write.mode("overwrite").format("parquet").saveAsTable(COVID_DATA_STAGING_TABLE)
+    clustered(spark.table(COVID_DATA_STAGING_TABLE)).write.insertInto(COVID_DATA_TABLE, overwrite=True)
+    spark.sql(f"DROP TABLE IF EXISTS {COVID_DATA_STAGING_TABLE}")
+
+
+def with_recomputed_deltas(spark, merged_df, covid_data_df, touched_dates):
+    """ Recomputes the daily changes of the locations in covid_data_df, from their first touched date through
+        the reports loaded up to DELTA_LOOKBACK_DAYS after the last touched date. A late or replaced report
+        changes the daily change of the next report of its location, which may be in a partition the merge
+        does not touch.
+        Returns the rows to write: merged_df with the recomputed changes, plus the whole loaded partitions
+        in which a daily change was corrected.
+    """
+    dates = sorted(date for date in touched_dates if date is not None)
+    if not dates:
+        return merged_df
+
+    loaded_df = spark.table(COVID_DATA_TABLE)
+    locations_df = covid_data_df.select(*LOCATION_KEYS).distinct()
+
+    # Loaded reports of these locations after the first touched date, on the dates the merge does not rewrite
+    following_df = loaded_df.where(
+        (col("date") > lit(dates[0]))
+        & (col("date") <= date_add(lit(dates[-1]), DELTA_LOOKBACK_DAYS))
+        & ~col("date").isin(dates)
+    ).join(locations_df, LOCATION_KEYS, "left_semi")
+
+    # Every report of these locations from the first touched date on is compared with its previous one,
+    # which is either among them or the last report loaded before the first touched date
+    affected_df = merged_df.where(col("date").isNotNull()).join(locations_df, LOCATION_KEYS, "left_semi")
+    previous_df = reports_before(spark, dates[0], locations_df)
+    recomputed_df = add_daily_deltas(affected_df.unionByName(following_df), previous_df) \
+        .select(*COVID_DATA_COLUMNS)
+
+    # Only the loaded partitions in which a daily change differs from the stored one are rewritten
+    changed_dates = [
+        row["date"] for row in
+        recomputed_df.where(~col("date").isin(dates)).subtract(following_df.select(*COVID_DATA_COLUMNS))
+        .select("date").distinct().collect()
+    ]
+    rows_df = (
+        recomputed_df.where(col("date").isin(dates + changed_dates))
+        # Rows of other locations, and rows without a date, keep their stored changes
+        .unionByName(merged_df.join(locations_df, LOCATION_KEYS, "left_anti"))
+        .unionByName(merged_df.where(col("date").isNull()).join(locations_df, LOCATION_KEYS, "left_semi"))
+    )
+    if changed_dates:
+        rows_df = rows_df.unionByName(
+            loaded_df.where(col("date").isin(changed_dates)).join(locations_df, LOCATION_KEYS, "left_anti")
+        )
+    return rows_df.select(*COVID_DATA_COLUMNS)
+
+
+def run_stage(spark, staging_dir, stage, build):
+    """ Returns the output of one stage of a run, staged as Parquet under staging_dir/stage.
+        A stage that completed in an earlier attempt of the run (its _SUCCESS marker exists)
+        is read back instead of being built again.
+    """
+    path = f"{staging_dir}/{stage}"
+    if path_exists(spark, f"{path}/_SUCCESS"):
+        print(f"Stage {stage}: already done, reading {path}")
+    else:
+        print(f"Stage {stage}: running")
+        build().write.mode("overwrite").parquet(path)
+    return spark.read.parquet(path)
+
+
+def read_stage(spark, staging_dir, entries):
+    """ Stages the raw rows of the files under raw/, then the entries of the files that could be read under files/.
+        Returns (raw_df, read_entries); raw_df is None when no file could be read.
+    """
+    def read_files():
+        # raw/ only counts once files/ is written, so the batches of an interrupted attempt are read again
+        delete_path(spark, f"{staging_dir}/raw")
+        _, failed = read_in_batches(spark, [entry.path for entry in entries], f"{staging_dir}/raw")
+        return spark.createDataFrame([entry for entry in entries if entry.path not in failed], ENTRY_SCHEMA)
+
+    read_entries = [ManifestEntry(*row) for row in run_stage(spark, staging_dir, "files", read_files).collect()]
+    if not read_entries:
+        return None, []
+    return spark.read.option("recursiveFileLookup", "true").parquet(f"{staging_dir}/raw"), read_entries
+
+
+def clean_stage(spark, staging_dir, covid_raw_df, run_id):
+    flagged = []
+
+    def clean():
+        cleaned_df, flagged_df = clean_daily_reports(spark, covid_raw_df, run_id)
+        flagged.append(flagged_df)
+        return cleaned_df
+
+    cleaned_df = run_stage(spark, staging_dir, "cleaned", clean)
+    for flagged_df in flagged:
+        flagged_df.unpersist()
+    return cleaned_df
+
+
+def country_stage(spark, staging_dir, covid_raw_df):
+    return run_stage(spark, staging_dir, "country", lambda: country_dimension(spark, covid_raw_df))
+
+
+def covid_data_stage(spark, staging_dir, covid_raw_df, country_df, incremental):
+    def build():
+        return build_covid_data(spark, covid_raw_df, country_df, incremental)
+
+    return run_stage(spark, staging_dir, "covid_data", build)
+
+
+def publish(spark, country_df, covid_data_df, full_load, replace_existing=False):
+    """ Writes the staged Country dimension and CovidData rows of a run to the production tables
+    """
+    # The staged dimension holds the existing countries plus the new ones
+    country_df.write.insertInto(COUNTRY_TABLE, overwrite=True)
+
+    if full_load:
+        # A full load replaces every partition, not only the dates present in the files. insertInto ignores
+        # the writer's partitionOverwriteMode option, so the session's dynamic mode is switched off for this write.
+        overwrite_mode = spark.conf.get("spark.sql.sources.partitionOverwriteMode")
+        spark.conf.set("spark.sql.sources.partitionOverwriteMode", "static")
+        try:
+            clustered(covid_data_df).write.insertInto(COVID_DATA_TABLE, overwrite=True)
+        finally:
+            spark.conf.set("spark.sql.sources.partitionOverwriteMode", overwrite_mode)
+    else:
+        merge_into_covid_data(spark, covid_data_df, replace_existing)
+
+
+def ingest_run(spark, run_id, entries, full_load, replace_existing=False):
+    """ Runs the pipeline on a set of files. Every stage is staged under STAGING_PATH/<run_id>,
+        and the production tables are only written once all of them are done.
+        If the run fails, rerunning with the same run id skips the stages that completed.
+    """
+    staging_dir = f"{Config.STAGING_PATH}/{run_id}"
+    try:
+        covid_raw_df, read_entries = read_stage(spark, staging_dir, entries)
+        if covid_raw_df is None:
+            print("None of the files could be read")
+            delete_path(spark, staging_dir)
+            return
+
+        cleaned_df = clean_stage(spark, staging_dir, covid_raw_df, run_id)
+        country_df = country_stage(spark, staging_dir, cleaned_df)
+        covid_data_df = covid_data_stage(spark, staging_dir, cleaned_df, country_df, incremental=not full_load)
+
+        publish(spark, country_df, covid_data_df, full_load, replace_existing)
+        build_serving_tables(spark)
+
+        # Record every loaded file so later incremental runs only pick up what comes after.
+        # Files that failed are not recorded, the next incremental run tries them again.
+        record_files(spark, read_entries)
+
+        # Tells the API that the data it may have cached is out of date
+        publish_data_version(spark, run_id)
+    except Exception:
+        print(f"Run {run_id} failed, its completed stages are kept in {staging_dir}. "
+              f"Rerun with --run-id {run_id} to resume it.")
+        raise
+
+    delete_path(spark, staging_dir)
+
+
+def run_full(spark, files, run_id):
+    # Every listed file is part of a full load
+    entries, _, _ = pending_files(spark, files, {})
+    ingest_run(spark, run_id, entries, full_load=True)
+
+
+def ingest_files(spark, entries, replace_existing, run_id=None):
+    # Runs the whole pipeline on a set of files and merges the result into CovidData
+    ingest_run(spark, run_id or new_run_id(), entries, full_load=False, replace_existing=replace_existing)
+
+
+def run_incremental(spark, files, run_id):
+    new_entries, changed_entries, touched_entries = pending_files(spark, files, load_manifest(spark))
+    # Files whose content did not change are not ingested, only their new size and mtime are recorded
+    record_files(spark, [], touched_entries)
+    entries = new_entries + changed_entries
+    if not entries:
+        print("No new or changed files to ingest")
+        return
+
+    print(f"Ingesting {len(new_entries)} new and {len(changed_entries)} changed files")
+    ingest_files(spark, entries, replace_existing=bool(changed_entries), run_id=run_id)
+
+
+def run_stream(spark):
+    """ Watches HADOOP_FILE_PATH with Structured Streaming and ingests new files as they land.
+        The stream only carries file metadata; each micro-batch runs the same pipeline as an
+        incremental run on its files, so every schema layout and cleaning step applies unchanged.
+    """
+    def ingest_micro_batch(batch_df, batch_id):
+        files = [FileInfo(row["path"], row["length"], row["mtime"]) for row in batch_df.collect()]
+
+        # Files already in the manifest (e.g. loaded by a batch run before the stream started) are skipped
+        new_entries, changed_entries, touched_entries = pending_files(spark, files, load_manifest(spark))
+        record_files(spark, [], touched_entries)
+        entries = new_entries + changed_entries
+        if not entries:
+            return
+
+        print(f"Micro-batch {batch_id}: ingesting {len(entries)} files")
+        # A batch replayed after a failure replaces the rows it wrote before, so each file lands exactly once
+        ingest_files(spark, entries, replace_existing=True)
+
+    query = (
+        spark.readStream
+        .format("binaryFile")
+        .option("pathGlobFilter", "*.{csv,json,jsonl,ndjson}")
+        # Streaming file sources do not infer their schema by default, so the binaryFile schema is given
+        .schema(BINARY_FILE_SCHEMA)
+        .load(Config.HADOOP_FILE_PATH)
+        # Without the content column the file source only lists files, it does not read them
+        .select("path", "length", expr("unix_millis(modificationTime)").alias("mtime"))
+        .writeStream
+        .foreachBatch(ingest_micro_batch)
+        .option("checkpointLocation", Config.STREAM_CHECKPOINT_PATH)
+        .trigger(processingTime=Config.STREAM_TRIGGER_INTERVAL)
+        .start()
+    )
+    query.awaitTermination()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the COVID-19 daily reports into Hive")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--incremental", action="store_true",
+        help="only ingest files that are new or changed since the last run, and merge them into CovidData"
+    )
+    mode.add_argument(
+        "--stream", action="store_true",
+        help="keep running and ingest new files as they land in HADOOP_FILE_PATH"
+    )
+    parser.add_argument(
+        "--run-id",
+        help="resume a failed full or incremental run, skipping the stages it completed (default: a new run)"
+    )
+    args = parser.parse_args()
+    run_id = args.run_id or new_run_id()
+
+    # Initialize SparkSession with Hive Support
+    spark = create_session_hive()
+    create_tables(spark)
+
+    if args.stream:
+        run_stream(spark)
+    elif args.incremental:
+        print(f"Run {run_id}")
+        run_incremental(spark, list_files(spark, Config.HADOOP_FILE_PATH, DAILY_REPORT_SUFFIXES), run_id)
+    else:
+        print(f"Run {run_id}")
+        run_full(spark, list_files(spark, Config.HADOOP_FILE_PATH, DAILY_REPORT_SUFFIXES), run_id)
+
+    # Stop the Spark session
+    spark.stop()
 
-# Populate CovidData Table
-covid_data_df.write.mode("overwrite").insertInto("database_name.CovidData")
 
-# Stop the Spark session
-spark.stop()
+if __name__ == "__main__":
+    main()
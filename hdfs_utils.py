@@ -0,0 +1,106 @@
+from collections import namedtuple
+
+# Size (bytes) and modification time (epoch millis) of a data file
+FileInfo = namedtuple("FileInfo", ["path", "size", "mtime"])
+
+
+def _hadoop_fs(spark, path):
+    # Resolve the Hadoop FileSystem (HDFS, local, ...) that owns the given path
+    hadoop_path = spark._jvm.org.apache.hadoop.fs.Path(path)
+    fs = hadoop_path.getFileSystem(spark._jsc.hadoopConfiguration())
+    return fs, hadoop_path
+
+
+def list_files(spark, path, suffixes=(".csv",)):
+    """ Lists the data files under a file, directory or glob pattern,
+        sorted by path. Only files ending with one of the suffixes are kept.
+    """
+    fs, hadoop_path = _hadoop_fs(spark, path)
+    statuses = fs.globStatus(hadoop_path) or []
+
+    files = []
+    for status in statuses:
+        children = fs.listStatus(status.getPath()) if status.isDirectory() else [status]
+        for child in children:
+            name = child.getPath().getName()
+            if child.isFile() and name.lower().endswith(suffixes):
+                files.append(FileInfo(child.getPath().toString(), child.getLen(), child.getModificationTime()))
+
+    return sorted(files)
+
+
+def read_first_line(spark, path):
+    """ Reads the first line of a file without loading the rest of it
+    """
+    fs, hadoop_path = _hadoop_fs(spark, path)
+    jvm = spark._jvm
+    stream = fs.open(hadoop_path)
+    try:
+        reader = jvm.java.io.BufferedReader(jvm.java.io.InputStreamReader(stream, "UTF-8"))
+        return reader.readLine() or ""
+    finally:
+        stream.close()
+
+
+def read_prefix(spark, path, max_bytes):
+    """ Reads at most max_bytes from the start of a file, decoded as UTF-8
+    """
+    fs, hadoop_path = _hadoop_fs(spark, path)
+    jvm = spark._jvm
+    buffer = spark.sparkContext._gateway.new_array(jvm.byte, max_bytes)
+    stream = fs.open(hadoop_path)
+    try:
+        # read() may return fewer bytes than asked for, readFully fails on a short file
+        count = 0
+        while count < max_bytes:
+            read = stream.read(buffer, count, max_bytes - count)
+            if read < 0:
+                break
+            count += read
+        # Decoded on the JVM side, so only the string crosses to Python
+        return jvm.java.lang.String(buffer, 0, count, "UTF-8")
+    finally:
+        stream.close()
+
+
+def file_checksum(spark, path):
+    """ Returns the filesystem checksum of a file as a string, or None when
+        the filesystem does not provide one (e.g. the local filesystem)
+    """
+    fs, hadoop_path = _hadoop_fs(spark, path)
+    checksum = fs.getFileChecksum(hadoop_path)
+    return checksum.toString() if checksum is not None else None
+
+
+def data_file_sizes(spark, path):
+    """ Returns {partition directory name: [file sizes]} for a table location.
+        Files directly under the location are listed under "".
+        Hidden and marker files (starting with "." or "_") are skipped.
+    """
+    fs, hadoop_path = _hadoop_fs(spark, path)
+    sizes = {}
+    for status in fs.listStatus(hadoop_path):
+        name = status.getPath().getName()
+        if name.startswith((".", "_")):
+            continue
+        if status.isDirectory():
+            sizes[name] = [
+                child.getLen() for child in fs.listStatus(status.getPath())
+                if child.isFile() and not child.getPath().getName().startswith((".", "_"))
+            ]
+        else:
+            sizes.setdefault("", []).append(status.getLen())
+    return sizes
+
+
+def path_exists(spark, path):
+    fs, hadoop_path = _hadoop_fs(spark, path)
+    return fs.exists(hadoop_path)
+
+
+def delete_path(spark, path):
+    """ Deletes a file or directory tree; a path that does not exist is ignored
+    """
+    fs, hadoop_path = _hadoop_fs(spark, path)
+    if fs.exists(hadoop_path):
+        fs.delete(hadoop_path, True)
@@ -1,19 +1,128 @@
 # using hadoop and hive
-from flask import Flask, jsonify
-from pyspark.sql import SparkSession
-from session import create_session_hive
+import threading
+import time
+import pyarrow
+import pyarrow.compute
+from flask import Flask, Response, jsonify, request
+from werkzeug.datastructures import MultiDict
+from query_backend import get_backend, current_data_version
+from result_cache import cached
+from responses import respond, columns_json, check_not_modified, tag_and_compress, untagged
+from updates import UpdateFeed
 from config import Config
-from pyspark.sql.functions import sum, avg
 from constants import *
-from datetime import datetime
+from datetime import datetime, date
 from news_api_response import *
-# Initialize SparkSession with Hive Support
-spark = create_session_hive()
+# The query backend (Spark on Hive, or PyArrow on the Parquet files) is created by warm_up or the first request,
+# not at import; the Spark backend creates a single SparkSession that all requests share
 app = Flask(__name__)
 app.config.from_object(Config)
+# Keep the order of the results (e.g. countries sorted by cases) instead of sorting the keys
+app.json.sort_keys = False
+# Conditional GET (ETag from the data version) and gzip/brotli compression for every endpoint
+app.before_request(check_not_modified)
+app.after_request(tag_and_compress)
 
+# Country metrics by query parameter name, and the CountryTotals column they come from
+COUNTRY_METRICS = {
+    'total_cases': 'Total_Confirmed',
+    'total_deaths': 'Total_Deaths',
+    'total_recovered': 'Total_Recovered',
+    'total_active': 'Total_Active'
+}
+COUNTRY_SORT_KEYS = dict(COUNTRY_METRICS, name='Name')
+
+GRANULARITIES = ('day', 'week', 'month')
+
+# Query parameters of a request without any, parsed like the parameters of a request
+NO_PARAMS = MultiDict()
+
+
+class InvalidParameter(ValueError):
+    pass
+
+
+@app.errorhandler(InvalidParameter)
+def invalid_parameter(error):
+    return jsonify({'error': str(error)}), 400
+
+
+def list_param(args, name):
+    # Accepts both ?name=a&name=b and ?name=a,b
+    return [value.strip() for values in args.getlist(name) for value in values.split(',') if value.strip()]
+
+
+def int_param(args, name, default=None, minimum=0):
+    value = args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise InvalidParameter(f"{name} must be an integer, got {value!r}")
+    if number < minimum:
+        raise InvalidParameter(f"{name} must be at least {minimum}, got {number}")
+    return number
+
+
+def date_param(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise InvalidParameter(f"{name} must be a date as YYYY-MM-DD, got {value!r}")
+
+
+def countries_param(args):
+    countries = list_param(args, 'country')
+    unknown = [country for country in countries if country not in COUNTRIES]
+    if unknown:
+        raise InvalidParameter(f"Unknown countries: {', '.join(unknown)}")
+    return tuple(sorted(set(countries)))
+
+
+def country_query(args):
+    """ Parses the query parameters of /total_cases_by_country into the keyword arguments of country_total_cases.
+        The result is normalized (sorted, defaulted), so equivalent requests share a cache entry.
+    """
+    sort = args.get('sort') or '-total_cases'
+    descending = sort.startswith('-')
+    sort = sort.lstrip('-')
+    if sort not in COUNTRY_SORT_KEYS:
+        raise InvalidParameter(f"sort must be one of {', '.join(COUNTRY_SORT_KEYS)}, optionally prefixed with -")
+
+    metrics = list_param(args, 'metrics') or list(COUNTRY_METRICS)
+    unknown = [metric for metric in metrics if metric not in COUNTRY_METRICS]
+    if unknown:
+        raise InvalidParameter(f"Unknown metrics: {', '.join(unknown)}")
+
+    return {
+        'countries': countries_param(args),
+        'prefix': (args.get('prefix') or '').lower(),
+        'sort': sort,
+        'descending': descending,
+        'limit': int_param(args, 'limit'),
+        'offset': int_param(args, 'offset', default=0),
+        # Response fields follow the order of COUNTRY_METRICS whatever order they were asked in
+        'metrics': tuple(metric for metric in COUNTRY_METRICS if metric in metrics)
+    }
+
+
+def time_series_query(args):
+    """ Parses the query parameters of /total_cases_over_time into the keyword arguments of total_cases_over_time
+    """
+    start, end = date_param(args, 'start'), date_param(args, 'end')
+    if start is not None and end is not None and start > end:
+        raise InvalidParameter("start must not be after end")
+
+    granularity = args.get('granularity') or 'day'
+    if granularity not in GRANULARITIES:
+        raise InvalidParameter(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+    return {'start': start, 'end': end, 'granularity': granularity, 'countries': countries_param(args)}
 
-spark = create_session_hive()
 
 def is_valid_date_format(date_string):
     try:
@@ -27,186 +136,207 @@ def covid_news():
     return news
 
 
+def api_columns(table, columns):
+    # Keeps the given columns of a backend result, renamed to their API names
+    return table.select(list(columns)).rename_columns(list(columns.values()))
+
+
+@cached("total_cases")
 def total_cases():
-    
-    # Read CovidData table from Hive
-    covid_data_df = spark.sql("SELECT * FROM database_name.CovidData")
-    
-    # Calculate Total Cases, Deaths, Recoveries, and Active Cases
-    total_cases = covid_data_df.select(
-        sum("Confirmed").alias("Total_Confirmed"),
-        sum("Deaths").alias("Total_Deaths"),
-        sum("Recovered").alias("Total_Recovered"),
-        sum("Active").alias("Total_Active")
-    )
-    
-    # Collect the result as a dictionary
-    total_cases_dict = total_cases.collect()[0].asDict()
-    
-    # Format the dictionary to match the desired output
-    result = {
-        'total_cases': total_cases_dict['Total_Confirmed'],
-        'total_deaths': total_cases_dict['Total_Deaths'],
-        'total_recovered': total_cases_dict['Total_Recovered'],
-        'total_active': total_cases_dict['Total_Active']
-    }
-    
-    return result
-
-
-def country_total_cases():
-
-    # Read CovidData table from Hive
-    covid_data_df = spark.sql("SELECT * FROM database_name.CovidData")
-    
-    # Calculate Total Cases, Deaths, Recoveries, and Active Cases by Country
-    total_cases_by_country = (
-        covid_data_df
-        .groupBy("country_id")  # Assuming 'country_id' corresponds to countries
-        .agg(
-            sum("Confirmed").alias("Total_Confirmed"),
-            sum("Deaths").alias("Total_Deaths"),
-            sum("Recovered").alias("Total_Recovered"),
-            sum("Active").alias("Total_Active")
-        )
-        .orderBy("Total_Confirmed", ascending=False)
+
+    # Read the precomputed global totals
+    return api_columns(get_backend().scan(GLOBAL_TOTALS_TABLE), {
+        'Total_Confirmed': 'total_cases',
+        'Total_Deaths': 'total_deaths',
+        'Total_Recovered': 'total_recovered',
+        'Total_Active': 'total_active'
+    })
+
+
+@cached("total_cases_by_country")
+def country_total_cases(countries=(), prefix='', sort='total_cases', descending=True, limit=None, offset=0,
+                        metrics=tuple(COUNTRY_METRICS)):
+
+    # Read the precomputed totals by country, they already carry the country name.
+    # Only the countries of the COUNTRIES list are served; the filters, sort, page and metric columns
+    # are applied by the query backend, so only the rows and columns asked for are read out.
+    total_cases_table = get_backend().country_totals(
+        names=countries or tuple(COUNTRIES),
+        prefix=prefix,
+        order_by=COUNTRY_SORT_KEYS[sort],
+        descending=descending,
+        limit=limit,
+        offset=offset,
+        columns=[COUNTRY_METRICS[metric] for metric in metrics]
     )
-    
-    # Collect the result as a list of rows
-    total_cases_list = total_cases_by_country.collect()
-    
-    # Map country_id back to country names (join with the Country table)
-    country_df = spark.sql("SELECT * FROM database_name.Country")
-    country_map = {row["id"]: row["Name"] for row in country_df.collect()}
-    
-    # Format the result
-    result = {}
-    for row in total_cases_list:
-        country_id = row["country_id"]
-        country_name = country_map.get(country_id, "Unknown")
-        if country_name in COUNTRIES:  # Ensure it matches the COUNTRIES list
-            result[country_name] = {
-                'total_cases': row["Total_Confirmed"],
-                'total_deaths': row["Total_Deaths"],
-                'total_recovered': row["Total_Recovered"],
-                'total_active': row["Total_Active"]
-            }
-    
- 
-    
-    return result
+    return api_columns(total_cases_table, {'Name': 'country', **{COUNTRY_METRICS[metric]: metric for metric in metrics}})
+
 
+@cached("case_fatality_ratio")
 def case_fatality_ratio():
    
-    # Read CovidData table from Hive
-    covid_data_df = spark.sql("SELECT * FROM database_name.CovidData")
-    
-    # Calculate average case fatality ratio by country_id
-    cfr_by_country = (
-        covid_data_df
-        .groupBy("country_id")
-        .agg(avg("Case_Fatality_Ratio").alias("Avg_Case_Fatality_Ratio"))
-        .orderBy("Avg_Case_Fatality_Ratio", ascending=False)
-    )
-    
-    # Read Country table to map country_id to country name, latitude, and longitude
-    country_df = spark.sql("SELECT * FROM database_name.Country")
-    country_map = {
-        row["id"]: {
-            "name": row["Name"],
-            "latitude": row["latitide"],
-            "longitude": row["longitude"]
-        }
-        for row in country_df.collect()
+    # Read the precomputed average case fatality ratio by country, with its name, latitude and longitude
+    cfr_table = get_backend().scan(COUNTRY_CFR_TABLE, order_by="Avg_Case_Fatality_Ratio", descending=True)
+    cfr_table = cfr_table.filter(pyarrow.compute.is_in(cfr_table['Name'], value_set=pyarrow.array(list(COUNTRIES))))
+    return api_columns(cfr_table, {
+        'Name': 'country',
+        'Avg_Case_Fatality_Ratio': 'case_fatality_ratio',
+        'latitude': 'latitude',
+        'longitude': 'longitude'
+    })
+
+
+@cached("total_cases_over_time")
+def total_cases_over_time(start=None, end=None, granularity='day', countries=()):
+
+    # The world series comes from the precomputed global totals by date, the series of given countries
+    # from CovidData. Either way the date range is applied before the rows are summed up by date,
+    # and the week or month rollup is computed by the query backend.
+    country_ids = ()
+    if countries:
+        country_ids = tuple(get_backend().country_totals(
+            names=countries, prefix='', order_by='Name', descending=False, limit=None, offset=0,
+            columns=['country_id']
+        )['country_id'].to_pylist())
+    time_series = get_backend().time_series(start, end, granularity, country_ids)
+    if countries and not country_ids:
+        # None of the countries has data yet: the series keeps its columns but has no rows
+        time_series = time_series.slice(0, 0)
+
+    return api_columns(time_series, {
+        'date': 'date',
+        'Total_Confirmed': 'total_cases',
+        'Total_Deaths': 'total_deaths',
+        'Total_Recovered': 'total_recovered'
+    })
+
+
+@cached("dashboard_bundle")
+def dashboard_bundle():
+
+    # Everything the dashboard loads at startup. The parts are the results of the individual endpoints with
+    # their default parameters, so they share the cached results; tables are given column by column.
+    return {
+        'total_cases': global_totals_json(total_cases()),
+        'total_cases_by_country': columns_json(country_total_cases(**country_query(NO_PARAMS))),
+        'case_fatality_ratio': columns_json(case_fatality_ratio()),
+        'total_cases_over_time': columns_json(total_cases_over_time(**time_series_query(NO_PARAMS))),
+        'news': covid_news()
     }
-    
-    # Collect the results
-    cfr_by_country_list = cfr_by_country.collect()
-    
-    # Format the result
-    result = {}
-    for row in cfr_by_country_list:
-        country_id = row["country_id"]
-        country_data = country_map.get(country_id, {})
-        
-        if country_data and country_data["name"] in COUNTRIES:
-            country_name = country_data["name"]
-            result[country_name] = {
-                'case_fatality_ratio': row["Avg_Case_Fatality_Ratio"],
-                'latitude': country_data["latitude"],
-                'longitude': country_data["longitude"]
-            }
-    
-    return result
-
-
-def total_cases_over_time():
-
-    # Read CovidData table from Hive
-    covid_data_df = spark.sql("SELECT * FROM database_name.CovidData")
-    
-    # Convert 'Last_Update' to date type and aggregate total cases over time
-    total_cases_over_time = (
-        covid_data_df
-        .withColumn("date")
-        .groupBy("date")
-        .agg(
-            sum("Confirmed").alias("Total_Confirmed"),
-            sum("Deaths").alias("Total_Deaths"),
-            sum("Recovered").alias("Total_Recovered")
-        )
-        .orderBy("date")
-    )
-    
-    # Collect the results
-    total_cases_over_time_list = total_cases_over_time.collect()
-    
-    # Initialize lists to store the results
-    dates = []
-    total_cases = []
-    total_deaths = []
-    total_recovered = []
-    
-    # Populate the lists with data
-    for row in total_cases_over_time_list:
-        dates.append(row["date"])
-        total_cases.append(row["Total_Confirmed"])
-        total_deaths.append(row["Total_Deaths"])
-        total_recovered.append(row["Total_Recovered"])
-    
-    # Format the result as a dictionary
-    result = {
-        'date': dates,
-        'total_cases': total_cases,
-        'total_deaths': total_deaths,
-        'total_recovered': total_recovered
+
+
+def dashboard_snapshot():
+    # The bundle without the news, which do not come from the ingested data
+    return {part: payload for part, payload in dashboard_bundle().items() if part != 'news'}
+
+
+# Pushes the rows of the dashboard bundle that changed with each new data version to /updates clients
+update_feed = UpdateFeed(
+    dashboard_snapshot,
+    row_keys={'total_cases_by_country': 'country', 'case_fatality_ratio': 'country', 'total_cases_over_time': 'date'},
+    version_source=current_data_version,
+    poll_seconds=Config.DATA_VERSION_POLL_SECONDS,
+    keepalive_seconds=Config.UPDATES_KEEPALIVE_SECONDS,
+    max_subscribers=Config.UPDATES_MAX_CLIENTS
+)
+
+
+# Set once warm_up has run: until then /ready answers 503 so that load balancers send no traffic
+ready = threading.Event()
+
+
+def warm_up():
+    """ Starts the query backend (the SparkSession, on the Spark backend), loads the tables the API reads
+        into memory and computes the results the dashboard asks for, then marks the API ready.
+        The update feed's watcher then does the same for every new data version.
+    """
+    started = time.monotonic()
+    # CovidData is only read for the time series of given countries, load it up front as well
+    get_backend().table(COVID_DATA_TABLE)
+    # The dashboard bundle runs the default queries of every endpoint, which loads the serving tables
+    # (CountryTotals carries the country names and ids) and fills the result cache
+    update_feed.poll()
+    update_feed.start()
+    ready.set()
+    print(f"API warmed up in {time.monotonic() - started:.1f}s, data version {current_data_version()}")
+
+
+def warm_up_until_ready(retry_seconds=None):
+    """ Runs warm_up until it succeeds, e.g. once the ingestion job has published the first data version
+    """
+    while not ready.is_set():
+        try:
+            warm_up()
+        except Exception as error:
+            print(f"Warm-up failed, retrying: {error}")
+            time.sleep(retry_seconds or Config.DATA_VERSION_POLL_SECONDS)
+
+
+# Plain JSON payloads of the API contract, built column by column from the result tables
+
+def global_totals_json(table):
+    return {name: values[0] if values else None for name, values in table.to_pydict().items()}
+
+
+def by_country_json(table):
+    columns = table.to_pydict()
+    countries = columns.pop('country')
+    return {
+        country: {name: values[index] for name, values in columns.items()}
+        for index, country in enumerate(countries)
     }
-    return result
+
+
+def time_series_json(table):
+    return table.to_pydict()
 
 
 @app.route('/total_cases_by_country', methods=['GET'])
 def get_total_cases_by_country():
-    result = country_total_cases()
-    return jsonify(result)
+    result = country_total_cases(**country_query(request.args))
+    return respond(result, by_country_json)
 
 @app.route('/total_cases', methods=['GET'])
 def get_total_cases():
     result = total_cases()
-    return jsonify(result)
+    return respond(result, global_totals_json)
 
 @app.route('/case_fatality_ratio', methods=['GET'])
 def get_case_fatality_ratio():
     result = case_fatality_ratio()
-    return jsonify(result)
+    return respond(result, by_country_json)
 @app.route('/total_cases_over_time', methods=['GET'])
 def get_total_cases_over_time():
-    result = total_cases_over_time()
+    result = total_cases_over_time(**time_series_query(request.args))
+    return respond(result, time_series_json)
+
+@app.route('/dashboard_bundle', methods=['GET'])
+def get_dashboard_bundle():
+    result = dashboard_bundle()
     return jsonify(result)
 
+@app.route('/ready', methods=['GET'])
+@untagged
+def get_ready():
+    if not ready.is_set():
+        return jsonify({'status': 'warming up'}), 503
+    return jsonify({'status': 'ready'})
+
+@app.route('/updates', methods=['GET'])
+@untagged
+def get_updates():
+    events = update_feed.subscribe(request.headers.get('Last-Event-ID'))
+    if events is None:
+        return jsonify({'error': 'Too many update subscribers, try again later'}), 503
+    # Streamed as it is produced: not compressed or tagged, and not to be buffered by a proxy
+    return Response(events, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/news', methods=['GET'])
 def get_news():
     result = covid_news()
     return jsonify(result)
 
 if __name__ == '__main__':
+    warm_up()
     app.run(host='0.0.0.0', port=9001)
\ No newline at end of file
@@ -0,0 +1,126 @@
+import argparse
+import math
+from datetime import date
+
+from pyspark.sql.functions import col, hash, pmod, broadcast
+
+from session import create_session_hive
+from hdfs_utils import data_file_sizes
+from manifest import MANIFEST_TABLE
+from quality import QUALITY_REPORT_TABLE
+from data_ingestion import COVID_DATA_COLUMNS
+from constants import (
+    COUNTRY_TABLE, COVID_DATA_TABLE, GLOBAL_TOTALS_TABLE, COUNTRY_TOTALS_TABLE, COUNTRY_CFR_TABLE, DAILY_TOTALS_TABLE
+)
+
+COMPACTION_STAGING_TABLE = "database_name.CovidData_compaction"
+
+# Small tables that are appended to on every run; they are rewritten as a single file
+SMALL_TABLES = [COUNTRY_TABLE, MANIFEST_TABLE]
+
+ANALYZED_TABLES = [
+    COVID_DATA_TABLE, COUNTRY_TABLE, GLOBAL_TOTALS_TABLE, COUNTRY_TOTALS_TABLE, COUNTRY_CFR_TABLE,
+    DAILY_TOTALS_TABLE, QUALITY_REPORT_TABLE
+]
+
+
+def table_location(spark, table):
+    rows = spark.sql(f"DESCRIBE TABLE EXTENDED {table}").collect()
+    return next(row["data_type"] for row in rows if row["col_name"] == "Location")
+
+
+def file_stats(spark, table):
+    # {partition directory: (file count, bytes)}
+    return {
+        partition: (len(sizes), sum(sizes))
+        for partition, sizes in data_file_sizes(spark, table_location(spark, table)).items()
+    }
+
+
+def compact_covid_data(spark, target_file_bytes):
+    """ Rewrites every CovidData partition that has more files than its size needs.
+        A partition gets ceil(bytes / target_file_bytes) files, rows are spread over them by
+        country_id and sorted by country_id inside each file.
+        Returns the number of partitions rewritten.
+    """
+    output_files = {}
+    for partition, (file_count, size) in file_stats(spark, COVID_DATA_TABLE).items():
+        # Rows without a date live in the default partition, which is left alone
+        if not partition.startswith("date=") or partition == "date=__HIVE_DEFAULT_PARTITION__":
+            continue
+        needed = max(1, math.ceil(size / target_file_bytes))
+        if file_count > needed:
+            output_files[date.fromisoformat(partition[len("date="):])] = needed
+
+    if not output_files:
+        return 0
+
+    # Spark cannot overwrite partitions it is reading from, so the partitions are staged first
+    spark.table(COVID_DATA_TABLE).where(col("date").isin(list(output_files))) \
+        .write.mode("overwrite").format("parquet").saveAsTable(COMPACTION_STAGING_TABLE)
+
+    output_files_df = spark.createDataFrame(list(output_files.items()), "date DATE, output_files INT")
+    (
+        spark.table(COMPACTION_STAGING_TABLE)
+        .join(broadcast(output_files_df), "date")
+        .withColumn("file_bucket", pmod(hash("country_id"), col("output_files")))
+        .repartition("date", "file_bucket")
+        .sortWithinPartitions("date", "country_id")
+        .select(*COVID_DATA_COLUMNS)
+        .write.insertInto(COVID_DATA_TABLE, overwrite=True)
+    )
+    spark.sql(f"DROP TABLE IF EXISTS {COMPACTION_STAGING_TABLE}")
+    return len(output_files)
+
+
+def rewrite_small_table(spark, table):
+    # The table fits on the driver, so it is rewritten from local rows rather than read and overwritten by Spark
+    df = spark.table(table)
+    rows = df.collect()
+    spark.createDataFrame(rows, df.schema).coalesce(1).write.insertInto(table, overwrite=True)
+
+
+def analyze_tables(spark):
+    # Row counts and column statistics for the cost-based optimizer
+    spark.sql(f"ANALYZE TABLE {COVID_DATA_TABLE} PARTITION (date) COMPUTE STATISTICS")
+    for table in ANALYZED_TABLES:
+        if spark.catalog.tableExists(table):
+            spark.sql(f"ANALYZE TABLE {table} COMPUTE STATISTICS FOR ALL COLUMNS")
+
+
+def print_report(before, after):
+    print(f"{'table':<40} {'files before':>12} {'files after':>12} {'bytes before':>14} {'bytes after':>14}")
+    for table in before:
+        files_before = sum(file_count for file_count, _ in before[table].values())
+        files_after = sum(file_count for file_count, _ in after[table].values())
+        bytes_before = sum(size for _, size in before[table].values())
+        bytes_after = sum(size for _, size in after[table].values())
+        print(f"{table:<40} {files_before:>12} {files_after:>12} {bytes_before:>14} {bytes_after:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the Hive tables and refresh their statistics")
+    parser.add_argument("--target-file-mb", type=int, default=128, help="target size of a CovidData file")
+    parser.add_argument("--skip-analyze", action="store_true", help="do not refresh table statistics")
+    args = parser.parse_args()
+
+    spark = create_session_hive()
+    tables = [COVID_DATA_TABLE] + SMALL_TABLES
+    before = {table: file_stats(spark, table) for table in tables}
+
+    compacted = compact_covid_data(spark, args.target_file_mb * 1024 * 1024)
+    print(f"Compacted {compacted} CovidData partitions")
+    for table in SMALL_TABLES:
+        rewrite_small_table(spark, table)
+
+    if not args.skip_analyze:
+        analyze_tables(spark)
+
+    after = {table: file_stats(spark, table) for table in tables}
+    print_report(before, after)
+
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+from collections import namedtuple
+from datetime import datetime
+
+from pyspark.sql.types import StructType, StructField, StringType, LongType, TimestampType
+
+from hdfs_utils import file_checksum
+
+MANIFEST_TABLE = "database_name.IngestManifest"
+
+# One processed input file: size in bytes, mtime in epoch millis, filesystem checksum (may be None)
+ManifestEntry = namedtuple("ManifestEntry", ["path", "size", "mtime", "checksum"])
+
+MANIFEST_SCHEMA = StructType([
+    StructField("path", StringType()),
+    StructField("size", LongType()),
+    StructField("mtime", LongType()),
+    StructField("checksum", StringType()),
+    StructField("ingested_at", TimestampType()),
+])
+
+# The same columns without ingested_at, to keep a list of ManifestEntry as a DataFrame
+ENTRY_SCHEMA = StructType(MANIFEST_SCHEMA.fields[:len(ManifestEntry._fields)])
+
+
+def create_manifest_table(spark):
+    spark.sql(f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            path STRING,
+            size BIGINT,
+            mtime BIGINT,
+            checksum STRING,
+            ingested_at TIMESTAMP
+        )
+    """)
+
+
+def load_manifest(spark):
+    """ Returns the processed files as a dict of path -> ManifestEntry
+    """
+    rows = spark.table(MANIFEST_TABLE).collect()
+    return {row["path"]: ManifestEntry(row["path"], row["size"], row["mtime"], row["checksum"]) for row in rows}
+
+
+def pending_files(spark, files, manifest):
+    """ Compares the listed files with the manifest.
+        Returns (new_entries, changed_entries, touched_entries); unchanged files are left out.
+        touched_entries are files whose size/mtime moved but whose checksum did not: they need no ingestion,
+        but their new size and mtime have to be recorded or every later run checksums them again.
+        Checksums are only computed for files that are new or whose size/mtime moved.
+    """
+    new_entries, changed_entries, touched_entries = [], [], []
+    for file_info in files:
+        known = manifest.get(file_info.path)
+        if known is not None and (known.size, known.mtime) == (file_info.size, file_info.mtime):
+            continue
+
+        entry = ManifestEntry(file_info.path, file_info.size, file_info.mtime, file_checksum(spark, file_info.path))
+        if known is None:
+            new_entries.append(entry)
+        elif entry.checksum is None or entry.checksum != known.checksum:
+            changed_entries.append(entry)
+        else:
+            touched_entries.append(entry)
+
+    return new_entries, changed_entries, touched_entries
+
+
+def record_files(spark, entries, touched_entries=()):
+    """ Adds or replaces the given entries in the manifest table.
+        touched_entries (see pending_files) get their new size and mtime but keep their ingested_at.
+    """
+    if not entries and not touched_entries:
+        return
+
+    # The manifest is small, so it is rebuilt on the driver instead of being read and overwritten by Spark
+    rows = {row["path"]: tuple(row) for row in spark.table(MANIFEST_TABLE).collect()}
+    ingested_at = datetime.now()
+    for entry in touched_entries:
+        previous_ingested_at = rows[entry.path][-1] if entry.path in rows else ingested_at
+        rows[entry.path] = (entry.path, entry.size, entry.mtime, entry.checksum, previous_ingested_at)
+    for entry in entries:
+        rows[entry.path] = (entry.path, entry.size, entry.mtime, entry.checksum, ingested_at)
+
+    spark.createDataFrame(list(rows.values()), MANIFEST_SCHEMA).write.insertInto(MANIFEST_TABLE, overwrite=True)
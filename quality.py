@@ -0,0 +1,157 @@
+import json
+import os
+from datetime import datetime
+
+from pyspark.sql import Window
+from pyspark.sql.functions import col, lit, when, row_number, sum, count, to_timestamp, to_date, coalesce, regexp_extract
+from pyspark.sql.types import StructType, StructField, StringType, LongType, TimestampType
+
+from schemas import CANONICAL_SCHEMA
+
+QUALITY_REPORT_TABLE = "database_name.DataQualityReport"
+
+# 1. Missing values in critical columns are filled with these defaults
+FILL_VALUES = {
+    "Province_State": "",
+    "Admin2": "",
+    "Case_Fatality_Ratio": 0.0,
+    "Confirmed": 0,
+    "Deaths": 0,
+    "Recovered": 0,
+    "Active": 0,
+    "Incident_Rate": 0.0
+}
+
+# 2. Rows without a Country_Region are dropped
+# 3. A location reports at most once per date: of several reports, the one with the latest Last_Update is kept.
+#    Admin2 is part of the location because the US reports county level rows under each Province_State.
+DEDUP_KEYS = ["Country_Region", "Province_State", "Admin2", "date"]
+
+# The report date comes from the file name (JHU names daily reports MM-DD-YYYY.csv).
+# When the name has no date, it falls back to Last_Update, which has been written in all these formats.
+FILE_DATE_PATTERN = r"(\d{2}-\d{2}-\d{4})\.[^/]*$"
+FILE_DATE_FORMAT = "MM-dd-yyyy"
+LAST_UPDATE_FORMATS = [
+    "yyyy-MM-dd HH:mm:ss",
+    "yyyy-MM-dd'T'HH:mm:ss",
+    "yyyy-MM-dd HH:mm",
+    "M/d/yyyy H:mm",
+    "M/d/yyyy H:mm:ss",
+    "M/d/yy H:mm",
+]
+
+# 4. Negative values in these columns are replaced with 0
+CLAMPED_COLUMNS = ["Confirmed", "Deaths", "Recovered", "Active", "Incident_Rate"]
+
+QUALITY_REPORT_SCHEMA = StructType([
+    StructField("run_id", StringType()),
+    StructField("source_file", StringType()),
+    StructField("column_name", StringType()),
+    StructField("metric", StringType()),
+    StructField("value", LongType()),
+    StructField("created_at", TimestampType()),
+])
+
+
+def flag_daily_reports(covid_raw_df):
+    """ Applies every cleaning step in a single projection.
+        Next to the cleaned columns and the report `date`, each row carries 0/1 flags saying what was changed,
+        plus `keep`, which is false for rows dropped for a null country or as older duplicates.
+    """
+    types = {field.name: field.dataType for field in CANONICAL_SCHEMA.fields}
+    columns, flags = [], []
+    for name in CANONICAL_SCHEMA.fieldNames():
+        value = col(name)
+        if name in FILL_VALUES:
+            flags.append(value.isNull().cast("int").alias(f"nulls_filled:{name}"))
+            value = when(value.isNull(), lit(FILL_VALUES[name]).cast(types[name])).otherwise(value)
+        if name in CLAMPED_COLUMNS:
+            flags.append((value < 0).cast("int").alias(f"negatives_clamped:{name}"))
+            value = when(value < 0, lit(0).cast(types[name])).otherwise(value)
+        columns.append(value.alias(name))
+
+    last_update = coalesce(*[to_timestamp(col("Last_Update"), date_format) for date_format in LAST_UPDATE_FORMATS])
+    file_date = to_date(regexp_extract(col("source_file"), FILE_DATE_PATTERN, 1), FILE_DATE_FORMAT)
+    report_date = coalesce(file_date, to_date(last_update))
+    flagged_df = covid_raw_df.select(
+        *columns,
+        last_update.alias("last_update_ts"),
+        report_date.alias("date"),
+        col("source_file"),
+        *flags,
+        file_date.isNull().cast("int").alias("date_from_last_update:date"),
+        report_date.isNull().cast("int").alias("missing_date:date")
+    )
+
+    # Ties on Last_Update go to the file that sorts last, so reruns keep the same row
+    latest_first = Window.partitionBy(*DEDUP_KEYS).orderBy(
+        col("last_update_ts").desc_nulls_last(), col("source_file").desc()
+    )
+    null_country = col("Country_Region").isNull()
+    duplicate = row_number().over(latest_first) > 1
+
+    return flagged_df.select(
+        *[col(f"`{name}`") for name in flagged_df.columns if name != "last_update_ts"],
+        null_country.cast("int").alias("dropped_null_country:Country_Region"),
+        (~null_country & duplicate).cast("int").alias(f"duplicates_removed:{','.join(DEDUP_KEYS)}"),
+        (~null_country & ~duplicate).alias("keep")
+    )
+
+
+def cleaned_rows(flagged_df):
+    # The rows and columns that go on to the country mapping
+    return flagged_df.where(col("keep")).select(*CANONICAL_SCHEMA.fieldNames(), "date", "source_file")
+
+
+def quality_report(flagged_df):
+    """ Counts the flags per source file.
+        Fill and clamp counts cover the rows that were kept; drop counts cover the rows that were removed.
+        Returns {source_file: {column: {metric: count}}}.
+    """
+    flag_columns = [name for name in flagged_df.columns if ":" in name]
+    aggregations = [count(lit(1)).alias("rows_read:*"), sum(col("keep").cast("int")).alias("rows_kept:*")]
+    for name in flag_columns:
+        kept_only = name.startswith(("nulls_filled:", "negatives_clamped:", "date_from_last_update:", "missing_date:"))
+        value = when(col("keep"), col(f"`{name}`")).otherwise(0) if kept_only else col(f"`{name}`")
+        aggregations.append(sum(value).alias(name))
+
+    report = {}
+    for row in flagged_df.groupBy("source_file").agg(*aggregations).collect():
+        file_report = report.setdefault(row["source_file"], {})
+        for name, value in row.asDict().items():
+            if name == "source_file":
+                continue
+            metric, column_name = name.split(":", 1)
+            file_report.setdefault(column_name, {})[metric] = value or 0
+    return report
+
+
+def write_quality_report(spark, run_id, report, report_dir):
+    """ Appends the report to the DataQualityReport table and writes it as JSON to report_dir
+    """
+    created_at = datetime.now()
+    rows = [
+        (run_id, source_file, column_name, metric, value, created_at)
+        for source_file, columns in report.items()
+        for column_name, metrics in columns.items()
+        for metric, value in metrics.items()
+    ]
+
+    spark.sql(f"""
+        CREATE TABLE IF NOT EXISTS {QUALITY_REPORT_TABLE} (
+            run_id STRING,
+            source_file STRING,
+            column_name STRING,
+            metric STRING,
+            value BIGINT,
+            created_at TIMESTAMP
+        )
+        USING PARQUET
+    """)
+    spark.createDataFrame(rows, QUALITY_REPORT_SCHEMA).write.insertInto(QUALITY_REPORT_TABLE)
+
+    os.makedirs(report_dir, exist_ok=True)
+    report_path = os.path.join(report_dir, f"quality_report_{run_id}.json")
+    with open(report_path, "w") as report_file:
+        json.dump({"run_id": run_id, "created_at": created_at.isoformat(), "files": report}, report_file, indent=2)
+    return report_path
@@ -0,0 +1,285 @@
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import pyarrow
+import pyarrow.compute
+import pyarrow.dataset
+
+from config import Config
+from constants import DATA_VERSION_TABLE, COUNTRY_TOTALS_TABLE, COVID_DATA_TABLE, DAILY_TOTALS_TABLE
+from serving_data import ServingData
+
+# Cumulative columns of the time series, and the CovidData column each one sums
+TIME_SERIES_COLUMNS = {"Total_Confirmed": "Confirmed", "Total_Deaths": "Deaths", "Total_Recovered": "Recovered"}
+
+
+class SparkBackend:
+    """ Answers the API queries with Spark SQL on the Hive tables.
+        The session is only created by the first query, so the Flask app starts without a JVM.
+        The tables the API reads are persisted in Spark memory, see serving_data.py.
+        One session is shared by all request threads; its jobs are scheduled FAIR across the
+        pools of SPARK_SCHEDULER_POOLS_FILE.
+    """
+
+    def __init__(self):
+        self._spark = None
+        self._lock = threading.Lock()
+        self.serving_data = ServingData(self._load, lambda df: df.unpersist())
+
+    @property
+    def spark(self):
+        with self._lock:
+            if self._spark is None:
+                # Imported here so that deployments on the Arrow backend do not need pyspark
+                from session import create_session_hive
+                self._spark = create_session_hive({
+                    "spark.scheduler.mode": "FAIR",
+                    "spark.scheduler.allocation.file": Config.SPARK_SCHEDULER_POOLS_FILE,
+                })
+        return self._spark
+
+    @contextmanager
+    def scheduler_pool(self, pool):
+        """ Runs the Spark jobs started by this thread inside the block in the given scheduler pool
+        """
+        # Local properties belong to the calling thread, so concurrent requests do not see each other's pool
+        context = self.spark.sparkContext
+        previous = context.getLocalProperty("spark.scheduler.pool")
+        context.setLocalProperty("spark.scheduler.pool", pool)
+        try:
+            yield
+        finally:
+            # Back to the enclosing query's pool, or to the default pool for the next request on this thread
+            context.setLocalProperty("spark.scheduler.pool", previous)
+
+    def _load(self, table, columns):
+        from pyspark import StorageLevel
+
+        # The ingestion job has rewritten the table's files since this session last listed them
+        self.spark.catalog.refreshTable(table)
+        # Cached DataFrames are stored as compressed column batches, so the pruned columns take little memory
+        df = self.spark.table(table).select(*columns).persist(StorageLevel.MEMORY_ONLY)
+        df.count()
+        return df
+
+    def table(self, table):
+        return self.serving_data.get(table, current_data_version())
+
+    def _to_arrow(self, df):
+        # The executors send Arrow record batches that are put together as one Arrow table,
+        # instead of pickled rows turned into Row objects one at a time
+        from pyspark.sql.pandas.types import to_arrow_schema
+
+        return pyarrow.Table.from_batches(df._collect_as_arrow(), schema=to_arrow_schema(df.schema))
+
+    def scan(self, table, order_by=None, descending=False):
+        """ Returns a table as an Arrow table, optionally sorted by one column
+        """
+        df = self.table(table)
+        if order_by is not None:
+            df = df.orderBy(order_by, ascending=not descending)
+        return self._to_arrow(df)
+
+    def country_totals(self, names, prefix, order_by, descending, limit, offset, columns):
+        """ Returns the CountryTotals rows of the given country names, with Name and the given columns.
+            The name filters, sort, offset and limit are applied by Spark, only the requested page is collected.
+        """
+        from pyspark.sql.functions import col, lower
+
+        df = self.table(COUNTRY_TOTALS_TABLE).where(col("Name").isin(list(names)))
+        if prefix:
+            df = df.where(lower(col("Name")).startswith(prefix.lower()))
+        # Ties are broken by name so that pages do not overlap
+        df = df.orderBy(col(order_by).desc() if descending else col(order_by).asc(), col("Name"))
+        if offset:
+            df = df.offset(offset)
+        if limit is not None:
+            df = df.limit(limit)
+        return self._to_arrow(df.select("Name", *columns))
+
+    def time_series(self, start, end, granularity, country_ids):
+        """ Returns the cumulative totals by date between start and end (inclusive, either may be None),
+            for the given countries or, when there are none, the whole world.
+            With granularity "week" or "month" each period gets the totals of its last reported day,
+            dated by the first day of the period. Filters and rollups run in Spark.
+        """
+        from pyspark.sql.functions import col, sum, max_by, date_trunc, to_date
+
+        if country_ids:
+            df = self.table(COVID_DATA_TABLE).where(col("country_id").isin(list(country_ids)))
+        else:
+            df = self.table(DAILY_TOTALS_TABLE)
+
+        # The date filters come before any aggregation, so cached batches outside the range are skipped
+        df = df.where(col("date").isNotNull())
+        if start is not None:
+            df = df.where(col("date") >= start)
+        if end is not None:
+            df = df.where(col("date") <= end)
+
+        if country_ids:
+            df = df.groupBy("date").agg(*[sum(column).alias(name) for name, column in TIME_SERIES_COLUMNS.items()])
+
+        if granularity != "day":
+            # Values are cumulative, so a period is summed up by its last day rather than by adding its days
+            df = df.groupBy(to_date(date_trunc(granularity, col("date"))).alias("period")).agg(
+                *[max_by(name, "date").alias(name) for name in TIME_SERIES_COLUMNS]
+            ).withColumnRenamed("period", "date")
+
+        return self._to_arrow(df.orderBy("date"))
+
+    def data_version(self):
+        # None until the ingestion job has published a version
+        if not self.spark.catalog.tableExists(DATA_VERSION_TABLE):
+            return None
+        # The ingestion job overwrites the table from another process; without a refresh this long-lived session
+        # keeps its cached file listing and reads files that no longer exist, or the old version
+        self.spark.catalog.refreshTable(DATA_VERSION_TABLE)
+        row = self.spark.table(DATA_VERSION_TABLE).first()
+        return row["version"] if row is not None else None
+
+
+class ArrowBackend:
+    """ Answers the API queries by reading the Parquet files of the Hive tables with PyArrow,
+        without Spark or a metastore. Tables are found under WAREHOUSE_PATH the way Hive lays them out,
+        <database>.db/<table name in lower case>. Meant for small deployments and CI.
+        The tables the API reads are kept in memory as Arrow tables, see serving_data.py.
+    """
+
+    def __init__(self, warehouse_path=None):
+        self.warehouse_path = warehouse_path or Config.WAREHOUSE_PATH
+        self.serving_data = ServingData(self._read)
+
+    def table_path(self, table):
+        database, name = table.split(".")
+        return os.path.join(self.warehouse_path, f"{database.lower()}.db", name.lower())
+
+    def _read(self, table, columns=None):
+        # Marker files such as _SUCCESS and .crc files are skipped by the dataset reader.
+        # The date partition directories of CovidData are read as dates rather than strings.
+        partitioning = "hive"
+        if table == COVID_DATA_TABLE:
+            partitioning = pyarrow.dataset.partitioning(
+                pyarrow.schema([("date", pyarrow.date32())]), flavor="hive"
+            )
+        dataset = pyarrow.dataset.dataset(self.table_path(table), format="parquet", partitioning=partitioning)
+        return dataset.to_table(columns=columns)
+
+    def scheduler_pool(self, pool):
+        # Queries run in the request thread, there is no scheduler to share
+        return nullcontext()
+
+    def table(self, table):
+        return self.serving_data.get(table, current_data_version())
+
+    def scan(self, table, order_by=None, descending=False):
+        """ Returns a table as an Arrow table, optionally sorted by one column
+        """
+        arrow_table = self.table(table)
+        if order_by is not None:
+            arrow_table = arrow_table.sort_by([(order_by, "descending" if descending else "ascending")])
+        return arrow_table
+
+    def country_totals(self, names, prefix, order_by, descending, limit, offset, columns):
+        """ Returns the CountryTotals rows of the given country names, with Name and the given columns.
+            The name filters, sort, offset and limit run as Arrow compute kernels before any row is converted.
+        """
+        compute = pyarrow.compute
+        arrow_table = self.table(COUNTRY_TOTALS_TABLE)
+        mask = compute.is_in(arrow_table["Name"], value_set=pyarrow.array(list(names), pyarrow.string()))
+        if prefix:
+            mask = compute.and_(mask, compute.starts_with(compute.utf8_lower(arrow_table["Name"]), prefix.lower()))
+        # Ties are broken by name so that pages do not overlap
+        arrow_table = arrow_table.filter(mask).sort_by([
+            (order_by, "descending" if descending else "ascending"), ("Name", "ascending")
+        ])
+        arrow_table = arrow_table.slice(offset, limit)
+        return arrow_table.select(["Name", *columns])
+
+    def time_series(self, start, end, granularity, country_ids):
+        """ Returns the cumulative totals by date between start and end (inclusive, either may be None),
+            for the given countries or, when there are none, the whole world.
+            With granularity "week" or "month" each period gets the totals of its last reported day,
+            dated by the first day of the period. Filters and rollups run as Arrow compute kernels.
+        """
+        compute = pyarrow.compute
+
+        if country_ids:
+            arrow_table = self.table(COVID_DATA_TABLE)
+            mask = compute.is_in(arrow_table["country_id"], value_set=pyarrow.array(list(country_ids), pyarrow.int32()))
+        else:
+            arrow_table = self.table(DAILY_TOTALS_TABLE)
+            mask = compute.is_valid(arrow_table["date"])
+        if start is not None:
+            mask = compute.and_(mask, compute.greater_equal(arrow_table["date"], pyarrow.scalar(start, pyarrow.date32())))
+        if end is not None:
+            mask = compute.and_(mask, compute.less_equal(arrow_table["date"], pyarrow.scalar(end, pyarrow.date32())))
+        arrow_table = arrow_table.filter(mask)
+
+        if country_ids:
+            # Aggregated columns are named <column>_<aggregation>
+            summed = arrow_table.group_by("date").aggregate(
+                [(column, "sum") for column in TIME_SERIES_COLUMNS.values()]
+            )
+            arrow_table = pyarrow.table(
+                {"date": summed["date"], **{name: summed[f"{column}_sum"] for name, column in TIME_SERIES_COLUMNS.items()}}
+            )
+        arrow_table = arrow_table.select(["date", *TIME_SERIES_COLUMNS]).sort_by("date")
+
+        if granularity != "day":
+            # Values are cumulative, so a period is summed up by its last day rather than by adding its days.
+            # The grouping keeps the date order only when it runs on one thread.
+            period = compute.floor_temporal(arrow_table["date"], unit=granularity)
+            last = arrow_table.append_column("period", period).group_by("period", use_threads=False).aggregate(
+                [(name, "last") for name in TIME_SERIES_COLUMNS]
+            )
+            arrow_table = pyarrow.table(
+                {"date": last["period"], **{name: last[f"{name}_last"] for name in TIME_SERIES_COLUMNS}}
+            )
+
+        return arrow_table.sort_by("date")
+
+    def data_version(self):
+        # None until the ingestion job has published a version
+        if not os.path.exists(self.table_path(DATA_VERSION_TABLE)):
+            return None
+        rows = self._read(DATA_VERSION_TABLE).to_pylist()
+        return rows[0]["version"] if rows else None
+
+
+BACKENDS = {"spark": SparkBackend, "arrow": ArrowBackend}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+# Last data version read from the DataVersion table, and when (time.monotonic)
+_data_version = None
+_data_version_checked_at = None
+_data_version_lock = threading.Lock()
+
+
+def get_backend():
+    """ Returns the query backend selected by QUERY_BACKEND, created on first use
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if Config.QUERY_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown QUERY_BACKEND {Config.QUERY_BACKEND!r}, expected one of {sorted(BACKENDS)}")
+            _backend = BACKENDS[Config.QUERY_BACKEND]()
+    return _backend
+
+
+def current_data_version():
+    """ Returns the data version published by the ingestion job,
+        looked up at most every DATA_VERSION_POLL_SECONDS
+    """
+    global _data_version, _data_version_checked_at
+    with _data_version_lock:
+        now = time.monotonic()
+        if _data_version_checked_at is None or now - _data_version_checked_at >= Config.DATA_VERSION_POLL_SECONDS:
+            _data_version = get_backend().data_version()
+            _data_version_checked_at = now
+        return _data_version
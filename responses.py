@@ -0,0 +1,128 @@
+import gzip
+import hashlib
+
+import pyarrow
+import pyarrow.compute
+import pyarrow.parquet
+from flask import Response, current_app, g, jsonify, request
+
+from query_backend import current_data_version
+
+try:
+    # Optional: with the brotli package installed, clients that accept it get br instead of gzip
+    import brotli
+except ImportError:
+    brotli = None
+
+# Media types an endpoint with tabular results can answer in, chosen through the Accept header.
+# Plain JSON keeps the shape documented in the API contract; the others carry the result table column by column.
+JSON = "application/json"
+COLUMNS_JSON = "application/vnd.athena.columns+json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+
+MEDIA_TYPES = [JSON, COLUMNS_JSON, ARROW_STREAM, PARQUET]
+
+# Content encodings in order of preference, and the smallest body worth compressing
+ENCODINGS = ["br", "gzip"] if brotli is not None else ["gzip"]
+MIN_COMPRESSED_BYTES = 512
+
+
+def columns_json(table):
+    # {"column": [values]}, with dates written as YYYY-MM-DD
+    columns = {}
+    for name in table.column_names:
+        column = table[name]
+        if pyarrow.types.is_date(column.type):
+            column = pyarrow.compute.cast(column, pyarrow.string())
+        columns[name] = column.to_pylist()
+    return columns
+
+
+def arrow_stream(table):
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def parquet_file(table):
+    sink = pyarrow.BufferOutputStream()
+    pyarrow.parquet.write_table(table, sink)
+    return sink.getvalue().to_pybytes()
+
+
+def respond(table, to_json):
+    """ Answers with a result table in the media type the client prefers.
+        to_json(table) builds the plain JSON payload of the endpoint.
+    """
+    media_type = request.accept_mimetypes.best_match(MEDIA_TYPES, default=JSON)
+    if media_type == COLUMNS_JSON:
+        response = jsonify(columns_json(table))
+        response.mimetype = COLUMNS_JSON
+    elif media_type == ARROW_STREAM:
+        response = Response(arrow_stream(table), mimetype=ARROW_STREAM)
+    elif media_type == PARQUET:
+        response = Response(parquet_file(table), mimetype=PARQUET)
+    else:
+        response = jsonify(to_json(table))
+    response.vary.add("Accept")
+    return response
+
+
+def content_encoding():
+    # The encoding the client prefers among ENCODINGS, or None
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def representation_etag(version):
+    """ Strong ETag of the response to the current request: the same data version, URL, Accept header
+        and content encoding always give the same bytes
+    """
+    key = "\n".join([str(version), request.full_path, request.headers.get("Accept", ""), content_encoding() or ""])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def untagged(view):
+    """ Marks a view whose responses get no ETag. check_not_modified skips it, so it never waits
+        for the data version (and with it for the SparkSession).
+    """
+    view.untagged = True
+    return view
+
+
+def check_not_modified():
+    """ before_request hook: answers 304 when the client already has the current representation.
+        Only the data version is looked up (at most every DATA_VERSION_POLL_SECONDS), no query runs.
+    """
+    if request.method != "GET":
+        return None
+    if getattr(current_app.view_functions.get(request.endpoint), "untagged", False):
+        return None
+    g.etag = representation_etag(current_data_version())
+    if request.if_none_match.contains(g.etag):
+        response = Response(status=304)
+        response.set_etag(g.etag)
+        response.vary.update(["Accept", "Accept-Encoding"])
+        return response
+    return None
+
+
+def tag_and_compress(response):
+    """ after_request hook: adds the ETag to successful responses and compresses their body
+    """
+    etag = g.get("etag")
+    if etag is None or response.status_code != 200 or response.is_streamed or response.direct_passthrough:
+        return response
+
+    response.set_etag(etag)
+    # Clients may keep the response but have to revalidate it, which costs a 304 until new data is published
+    response.headers["Cache-Control"] = "no-cache"
+
+    encoding = content_encoding()
+    body = response.get_data()
+    if encoding is not None and len(body) >= MIN_COMPRESSED_BYTES:
+        response.set_data(brotli.compress(body) if encoding == "br" else gzip.compress(body, compresslevel=6))
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from config import Config
+from query_backend import get_backend, current_data_version
+
+
+class ResultCache:
+    """ Bounded LRU cache of API results, valid for one data version.
+        When version_source returns a new version every entry is dropped, so a result computed
+        before new data landed is never served after the API has seen the new version.
+    """
+
+    def __init__(self, max_entries, version_source):
+        self.max_entries = max_entries
+        self.version_source = version_source
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+
+    def _check_version(self):
+        version = self.version_source()
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._entries.clear()
+
+    def get_or_compute(self, key, compute):
+        self._check_version()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            version = self._version
+
+        # Computed outside the lock, so a slow query does not hold up cache hits for other requests
+        result = compute()
+        with self._lock:
+            # A result computed while the version moved is not kept
+            if version == self._version:
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+result_cache = ResultCache(Config.RESULT_CACHE_SIZE, current_data_version)
+
+
+def cache_key(endpoint, params):
+    # Parameters are keyword arguments that are already parsed and defaulted, sorted so their order does not matter
+    return endpoint, tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                                  for name, value in params.items()))
+
+
+def cached(endpoint):
+    """ Serves the results of the decorated query function from result_cache,
+        keyed by endpoint and the keyword arguments of the call.
+        On a miss the function runs in the scheduler pool named after the endpoint.
+    """
+    def decorator(function):
+        def compute(params):
+            with get_backend().scheduler_pool(endpoint):
+                return function(**params)
+
+        @wraps(function)
+        def wrapper(**params):
+            return result_cache.get_or_compute(cache_key(endpoint, params), lambda: compute(params))
+        return wrapper
+    return decorator
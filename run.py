@@ -0,0 +1,14 @@
+import threading
+
+from waitress import serve
+
+from config import Config
+from main import app, warm_up_until_ready
+
+if __name__ == "__main__":
+    # Production server: requests are handled by a pool of API_THREADS threads sharing one SparkSession,
+    # and the Spark jobs of each endpoint run in their own FAIR scheduler pool (fairscheduler.xml)
+    # The server accepts connections right away; /ready answers 503 until the warm-up thread has started
+    # the SparkSession, loaded the tables and computed the hot results
+    threading.Thread(target=warm_up_until_ready, name="warm-up", daemon=True).start()
+    serve(app, host="0.0.0.0", port=9001, threads=Config.API_THREADS)
@@ -0,0 +1,209 @@
+import csv
+import json
+from collections import namedtuple
+from functools import reduce
+
+from pyspark.sql import DataFrame
+from pyspark.sql.functions import col, lit, coalesce, input_file_name
+from pyspark.sql.types import StructType, StructField, StringType, IntegerType, FloatType
+
+from hdfs_utils import read_first_line, read_prefix
+
+# A known layout of the JHU daily report CSVs.
+# `schema` lists the columns in file order, `renames` maps file columns to canonical names.
+SchemaVersion = namedtuple("SchemaVersion", ["version", "schema", "renames"])
+
+# Columns every daily report is normalized to before cleaning (plus a source_file column)
+CANONICAL_SCHEMA = StructType([
+    StructField("Province_State", StringType()),
+    StructField("Admin2", StringType()),
+    StructField("Country_Region", StringType()),
+    StructField("Last_Update", StringType()),
+    StructField("Lat", FloatType()),
+    StructField("Long_", FloatType()),
+    StructField("Confirmed", IntegerType()),
+    StructField("Deaths", IntegerType()),
+    StructField("Recovered", IntegerType()),
+    StructField("Active", IntegerType()),
+    StructField("Incident_Rate", FloatType()),
+    StructField("Case_Fatality_Ratio", FloatType()),
+])
+
+_V1_FIELDS = [
+    StructField("Province/State", StringType()),
+    StructField("Country/Region", StringType()),
+    StructField("Last Update", StringType()),
+    StructField("Confirmed", IntegerType()),
+    StructField("Deaths", IntegerType()),
+    StructField("Recovered", IntegerType()),
+]
+_V1_RENAMES = {
+    "Province/State": "Province_State",
+    "Country/Region": "Country_Region",
+    "Last Update": "Last_Update",
+}
+
+_V3_FIELDS = [
+    StructField("FIPS", StringType()),
+    StructField("Admin2", StringType()),
+    StructField("Province_State", StringType()),
+    StructField("Country_Region", StringType()),
+    StructField("Last_Update", StringType()),
+    StructField("Lat", FloatType()),
+    StructField("Long_", FloatType()),
+    StructField("Confirmed", IntegerType()),
+    StructField("Deaths", IntegerType()),
+    StructField("Recovered", IntegerType()),
+    StructField("Active", IntegerType()),
+    StructField("Combined_Key", StringType()),
+]
+
+SCHEMA_VERSIONS = [
+    # 01-22-2020 .. 02-29-2020: no coordinates, no Active column
+    SchemaVersion(1, StructType(_V1_FIELDS), _V1_RENAMES),
+    # 03-01-2020 .. 03-21-2020: coordinates added as Latitude/Longitude
+    SchemaVersion(2, StructType(_V1_FIELDS + [
+        StructField("Latitude", FloatType()),
+        StructField("Longitude", FloatType()),
+    ]), dict(_V1_RENAMES, Latitude="Lat", Longitude="Long_")),
+    # 03-22-2020 .. 05-28-2020: county level rows, Lat/Long_, Active
+    SchemaVersion(3, StructType(_V3_FIELDS), {}),
+    # 05-29-2020 .. 11-08-2020: rates added under their first names
+    SchemaVersion(4, StructType(_V3_FIELDS + [
+        StructField("Incidence_Rate", FloatType()),
+        StructField("Case-Fatality_Ratio", FloatType()),
+    ]), {"Incidence_Rate": "Incident_Rate", "Case-Fatality_Ratio": "Case_Fatality_Ratio"}),
+    # 11-09-2020 onwards: rates renamed to Incident_Rate/Case_Fatality_Ratio
+    SchemaVersion(5, StructType(_V3_FIELDS + [
+        StructField("Incident_Rate", FloatType()),
+        StructField("Case_Fatality_Ratio", FloatType()),
+    ]), {}),
+]
+
+
+def header_fingerprint(header_line):
+    """ Normalizes a CSV header line to the tuple of its column names
+    """
+    names = next(csv.reader([header_line]), [])
+    return tuple(name.strip().lstrip("\ufeff").strip() for name in names)
+
+
+SCHEMA_REGISTRY = {tuple(version.schema.fieldNames()): version for version in SCHEMA_VERSIONS}
+
+
+def resolve_schema_version(header_line, path=None):
+    """ Returns the SchemaVersion whose columns match the given header line
+    """
+    fingerprint = header_fingerprint(header_line)
+    version = SCHEMA_REGISTRY.get(fingerprint)
+    if version is None:
+        raise ValueError(f"Unknown daily report layout in {path or 'file'}: {', '.join(fingerprint)}")
+    return version
+
+
+def _canonical_columns(source_names):
+    # source_names maps a canonical column to the source columns that can hold it, in order of preference.
+    # Every row is also tagged with the file it was read from.
+    columns = []
+    for field in CANONICAL_SCHEMA.fields:
+        names = source_names.get(field.name, [])
+        if len(names) == 1:
+            columns.append(col(f"`{names[0]}`").alias(field.name))
+        elif names:
+            columns.append(coalesce(*[col(f"`{name}`") for name in names]).alias(field.name))
+        else:
+            columns.append(lit(None).cast(field.dataType).alias(field.name))
+    columns.append(input_file_name().alias("source_file"))
+    return columns
+
+
+def to_canonical(df, version):
+    """ Projects a DataFrame read with a versioned schema onto CANONICAL_SCHEMA
+    """
+    source_names = {version.renames.get(name, name): [name] for name in version.schema.fieldNames()}
+    return df.select(*_canonical_columns(source_names))
+
+
+def _json_layout():
+    # JSON records are matched by field name, not position, so one schema declares every
+    # column name any layout has used and the variants are coalesced into the canonical columns.
+    # Newer layouts come first, so their names are preferred when a record has both.
+    fields, source_names = {}, {}
+    for version in reversed(SCHEMA_VERSIONS):
+        for field in version.schema.fields:
+            if field.name not in fields:
+                fields[field.name] = field
+                source_names.setdefault(version.renames.get(field.name, field.name), []).append(field.name)
+    return StructType(list(fields.values())), source_names
+
+
+JSON_SCHEMA, JSON_SOURCE_NAMES = _json_layout()
+
+CSV_SUFFIXES = (".csv",)
+JSON_SUFFIXES = (".json", ".jsonl", ".ndjson")
+DAILY_REPORT_SUFFIXES = CSV_SUFFIXES + JSON_SUFFIXES
+
+
+# How much of a .json file is read to tell JSON lines from multi-line JSON
+JSON_PREFIX_BYTES = 64 * 1024
+
+
+def is_json_lines(path, prefix):
+    """ Tells JSON-lines files (one record per line) apart from multi-line JSON
+        (an array of records, or a pretty-printed document) from the start of the file.
+        A compact array can be a single line of any length, so the first line is never read whole.
+    """
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        return True
+    content = prefix.lstrip()
+    if not content.startswith("{"):
+        # An array of records (or an empty file)
+        return not content
+    first_line, newline, _ = content.partition("\n")
+    if not newline:
+        # A single record that does not end within the prefix is one line either way
+        return True
+    try:
+        return isinstance(json.loads(first_line), dict)
+    except ValueError:
+        # The first record spans several lines: pretty-printed
+        return False
+
+
+def read_json_reports(spark, paths, json_lines):
+    """ Reads daily reports in JSON with the declared JSON_SCHEMA.
+        JSON-lines files are parsed line by line and split across tasks like CSV.
+        Multi-line files are parsed whole, one file per task.
+    """
+    df = spark.read.json(paths, schema=JSON_SCHEMA, multiLine=not json_lines)
+    return df.select(*_canonical_columns(JSON_SOURCE_NAMES))
+
+
+def read_daily_reports(spark, paths):
+    """ Reads the given daily report files (CSV or JSON) in one typed pass.
+        CSV files are grouped by header fingerprint and each group is read with
+        its declared schema, so Spark never has to infer column types.
+        JSON files are grouped into JSON-lines and multi-line files.
+    """
+    files_by_version = {}
+    json_files = {True: [], False: []}
+    for path in paths:
+        if path.lower().endswith(JSON_SUFFIXES):
+            json_files[is_json_lines(path, read_prefix(spark, path, JSON_PREFIX_BYTES))].append(path)
+        else:
+            version = resolve_schema_version(read_first_line(spark, path), path)
+            files_by_version.setdefault(version.version, []).append(path)
+
+    versions = {version.version: version for version in SCHEMA_VERSIONS}
+    frames = [
+        to_canonical(spark.read.csv(version_paths, header=True, schema=versions[number].schema), versions[number])
+        for number, version_paths in sorted(files_by_version.items())
+    ]
+    frames += [
+        read_json_reports(spark, json_paths, json_lines)
+        for json_lines, json_paths in json_files.items() if json_paths
+    ]
+
+    if not frames:
+        raise ValueError("No daily report files to read")
+    return reduce(DataFrame.unionByName, frames)
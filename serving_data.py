@@ -0,0 +1,67 @@
+import threading
+
+from constants import (
+    COVID_DATA_TABLE, GLOBAL_TOTALS_TABLE, COUNTRY_TOTALS_TABLE, COUNTRY_CFR_TABLE, DAILY_TOTALS_TABLE
+)
+
+# The columns the API reads from each table; only these are kept in memory
+SERVING_COLUMNS = {
+    COVID_DATA_TABLE: ["country_id", "Confirmed", "Deaths", "Recovered", "date"],
+    GLOBAL_TOTALS_TABLE: ["Total_Confirmed", "Total_Deaths", "Total_Recovered", "Total_Active"],
+    COUNTRY_TOTALS_TABLE: ["country_id", "Name", "Total_Confirmed", "Total_Deaths", "Total_Recovered", "Total_Active"],
+    COUNTRY_CFR_TABLE: ["Name", "Avg_Case_Fatality_Ratio", "latitude", "longitude"],
+    DAILY_TOTALS_TABLE: ["date", "Total_Confirmed", "Total_Deaths", "Total_Recovered"],
+}
+
+
+class ServingData:
+    """ In-memory copies of the tables the API reads, pruned to SERVING_COLUMNS and kept for one data version.
+        load(table, columns) reads a table into memory (a persisted DataFrame, an Arrow table, ...)
+        and release(data) frees it. A table is loaded by its first query; when the data version changes
+        every copy is released and the next queries load the new data.
+        Each table is loaded under its own lock, so loading CovidData does not hold up queries on the small tables.
+    """
+
+    def __init__(self, load, release=None):
+        self.load = load
+        self.release = release
+        self._tables = {}
+        self._version = None
+        self._lock = threading.Lock()
+        self._table_locks = {}
+
+    def _loaded(self, table, version):
+        # The copy of table for version, or None; called with self._lock held
+        if version != self._version:
+            self._release_all()
+            self._version = version
+        return self._tables.get(table)
+
+    def get(self, table, version):
+        with self._lock:
+            data = self._loaded(table, version)
+            if data is not None:
+                return data
+            table_lock = self._table_locks.setdefault(table, threading.Lock())
+
+        # Concurrent queries on the same table wait for one load instead of each loading it
+        with table_lock:
+            with self._lock:
+                data = self._loaded(table, version)
+                if data is not None:
+                    return data
+            data = self.load(table, SERVING_COLUMNS[table])
+            with self._lock:
+                if version == self._version:
+                    self._tables[table] = data
+                    return data
+            # The version moved during the load: the copy answers this query but is not kept
+            if self.release is not None:
+                self.release(data)
+            return data
+
+    def _release_all(self):
+        if self.release is not None:
+            for data in self._tables.values():
+                self.release(data)
+        self._tables = {}
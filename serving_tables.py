@@ -0,0 +1,122 @@
+from datetime import datetime
+
+from pyspark.sql.functions import col, sum, avg, broadcast
+from pyspark.sql.types import StructType, StructField, StringType, TimestampType
+
+from constants import (
+    COUNTRY_TABLE, COVID_DATA_TABLE, GLOBAL_TOTALS_TABLE, COUNTRY_TOTALS_TABLE, COUNTRY_CFR_TABLE, DAILY_TOTALS_TABLE,
+    DATA_VERSION_TABLE
+)
+
+DATA_VERSION_SCHEMA = StructType([
+    StructField("version", StringType()),
+    StructField("published_at", TimestampType()),
+])
+
+
+def create_serving_tables(spark):
+    spark.sql(f"""
+        CREATE TABLE IF NOT EXISTS {GLOBAL_TOTALS_TABLE} (
+            Total_Confirmed BIGINT,
+            Total_Deaths BIGINT,
+            Total_Recovered BIGINT,
+            Total_Active BIGINT
+        )
+        USING PARQUET
+    """)
+
+    spark.sql(f"""
+        CREATE TABLE IF NOT EXISTS {COUNTRY_TOTALS_TABLE} (
+            country_id INT,
+            Name STRING,
+            Total_Confirmed BIGINT,
+            Total_Deaths BIGINT,
+            Total_Recovered BIGINT,
+            Total_Active BIGINT
+        )
+        USING PARQUET
+    """)
+
+    spark.sql(f"""
+        CREATE TABLE IF NOT EXISTS {COUNTRY_CFR_TABLE} (
+            country_id INT,
+            Name STRING,
+            Avg_Case_Fatality_Ratio DOUBLE,
+            latitude FLOAT,
+            longitude FLOAT
+        )
+        USING PARQUET
+    """)
+
+    spark.sql(f"""
+        CREATE TABLE IF NOT EXISTS {DAILY_TOTALS_TABLE} (
+            date DATE,
+            Total_Confirmed BIGINT,
+            Total_Deaths BIGINT,
+            Total_Recovered BIGINT
+        )
+        USING PARQUET
+    """)
+
+    spark.sql(f"""
+        CREATE TABLE IF NOT EXISTS {DATA_VERSION_TABLE} (
+            version STRING,
+            published_at TIMESTAMP
+        )
+        USING PARQUET
+    """)
+
+
+def build_serving_tables(spark):
+    """ Rebuilds the serving tables read by the API from CovidData and Country
+    """
+    covid_data_df = spark.table(COVID_DATA_TABLE)
+    country_df = spark.table(COUNTRY_TABLE)
+
+    # Totals and average case fatality ratio by country come out of one aggregation
+    by_country_df = (
+        covid_data_df
+        .groupBy("country_id")
+        .agg(
+            sum("Confirmed").alias("Total_Confirmed"),
+            sum("Deaths").alias("Total_Deaths"),
+            sum("Recovered").alias("Total_Recovered"),
+            sum("Active").alias("Total_Active"),
+            avg("Case_Fatality_Ratio").alias("Avg_Case_Fatality_Ratio")
+        )
+        .join(broadcast(country_df.withColumnRenamed("id", "country_id")), "country_id", "left")
+        .cache()
+    )
+
+    # The serving tables are small, each one is written as a single file
+    by_country_df.select(
+        "country_id", "Name", "Total_Confirmed", "Total_Deaths", "Total_Recovered", "Total_Active"
+    ).coalesce(1).write.insertInto(COUNTRY_TOTALS_TABLE, overwrite=True)
+
+    by_country_df.select(
+        "country_id", "Name", "Avg_Case_Fatality_Ratio", "latitude", "longitude"
+    ).coalesce(1).write.insertInto(COUNTRY_CFR_TABLE, overwrite=True)
+
+    # The global total is the sum of the per-country rows, so CovidData is not scanned again
+    by_country_df.select(
+        sum("Total_Confirmed").alias("Total_Confirmed"),
+        sum("Total_Deaths").alias("Total_Deaths"),
+        sum("Total_Recovered").alias("Total_Recovered"),
+        sum("Total_Active").alias("Total_Active")
+    ).write.insertInto(GLOBAL_TOTALS_TABLE, overwrite=True)
+
+    by_country_df.unpersist()
+
+    covid_data_df.groupBy("date").agg(
+        sum("Confirmed").alias("Total_Confirmed"),
+        sum("Deaths").alias("Total_Deaths"),
+        sum("Recovered").alias("Total_Recovered")
+    ).where(col("date").isNotNull()).coalesce(1).write.insertInto(DAILY_TOTALS_TABLE, overwrite=True)
+
+
+def publish_data_version(spark, version):
+    """ Replaces the row of the DataVersion table once a run has published its data.
+        The API keeps cached results only as long as this version does not change.
+    """
+    spark.createDataFrame([(version, datetime.now())], DATA_VERSION_SCHEMA) \
+        .coalesce(1).write.insertInto(DATA_VERSION_TABLE, overwrite=True)
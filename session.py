@@ -1,23 +1,43 @@
 from pyspark.sql import SparkSession
-from config import HIVE_METASTORE_URI
+from config import HIVE_METASTORE_URI, WAREHOUSE_PATH
 def create_session():
     spark = SparkSession.builder.appName('Athena').getOrCreate()
     return spark
 
 from pyspark.sql import SparkSession
 
-def create_session_hive():
+def create_session_hive(extra_config=None):
     # Initialize Spark session with Hive support
-    spark = (
+    # extra_config holds settings only some callers need, e.g. the scheduler mode of the API
+    builder = (
         SparkSession.builder
         .appName('Athena')
         .config('spark.sql.catalogImplementation', 'hive')
         .config('spark.sql.hive.metastore.uris', HIVE_METASTORE_URI)  # Metastore URI
-        .config('spark.sql.warehouse.dir', '/user/hive/warehouse')  # HDFS or local path
-        .enableHiveSupport()
-        .getOrCreate()
+        .config('spark.sql.warehouse.dir', WAREHOUSE_PATH)  # HDFS or local path
+        .config('spark.sql.sources.partitionOverwriteMode', 'dynamic')  # Overwrite only the partitions written
+        .config('spark.sql.legacy.timeParserPolicy', 'CORRECTED')  # Unparseable timestamps become null
+        .config('spark.sql.cbo.enabled', 'true')  # Plan with the statistics refreshed by maintenance.py
+        .config('spark.sql.execution.arrow.pyspark.enabled', 'true')  # Results reach Python as Arrow batches
     )
+    for key, value in (extra_config or {}).items():
+        builder = builder.config(key, value)
+    spark = builder.enableHiveSupport().getOrCreate()
     return spark
 
 
-
+def create_session_local(warehouse_dir, metastore_dir):
+    # Spark local mode with an embedded Derby metastore, for benchmarks and development without a Hive cluster
+    spark = (
+        SparkSession.builder
+        .master('local[*]')
+        .appName('Athena')
+        .config('spark.sql.catalogImplementation', 'hive')
+        .config('spark.hadoop.javax.jdo.option.ConnectionURL', f'jdbc:derby:;databaseName={metastore_dir};create=true')
+        .config('spark.sql.warehouse.dir', warehouse_dir)
+        .config('spark.sql.sources.partitionOverwriteMode', 'dynamic')  # Overwrite only the partitions written
+        .config('spark.sql.legacy.timeParserPolicy', 'CORRECTED')  # Unparseable timestamps become null
+        .enableHiveSupport()
+        .getOrCreate()
+    )
+    return spark
@@ -0,0 +1,156 @@
+import argparse
+import csv
+import json
+import os
+import random
+from datetime import date, datetime, timedelta
+
+from constants import COUNTRIES
+from schemas import SCHEMA_VERSIONS
+
+# Last_Update formats used by the JHU daily reports, by layout version
+LAST_UPDATE_FORMATS = {
+    1: "{d.month}/{d.day}/{d.year} {d:%H:%M}",
+    2: "{d:%Y-%m-%dT%H:%M:%S}",
+    3: "{d:%Y-%m-%d %H:%M:%S}",
+    4: "{d:%Y-%m-%d %H:%M:%S}",
+    5: "{d:%Y-%m-%d %H:%M:%S}",
+}
+
+NUMERIC_COLUMNS = ["Confirmed", "Deaths", "Recovered", "Active", "Incident_Rate", "Case_Fatality_Ratio"]
+
+
+def make_regions(countries, provinces, rng):
+    """ Returns the (country, province, latitude, longitude, growth rate, population) of every reporting region
+    """
+    names = list(COUNTRIES)[:countries]
+    names += [f"Country {index}" for index in range(len(names), countries)]
+
+    regions = []
+    for name in names:
+        base = COUNTRIES.get(name, {"latitude": rng.uniform(-60, 70), "longitude": rng.uniform(-180, 180)})
+        for index in range(provinces):
+            regions.append((
+                name,
+                f"Province {index}" if provinces > 1 else "",
+                round(base["latitude"] + rng.uniform(-2, 2), 4),
+                round(base["longitude"] + rng.uniform(-2, 2), 4),
+                rng.uniform(5, 50),
+                rng.randint(100_000, 10_000_000),
+            ))
+    return regions
+
+
+def region_report(region, day_index, report_date, rng):
+    # Cumulative counts that grow over time, in the canonical column names
+    country, province, latitude, longitude, growth, population = region
+    confirmed = int(growth * (day_index + 1) ** 1.5)
+    deaths = int(confirmed * rng.uniform(0.005, 0.04))
+    recovered = int((confirmed - deaths) * min(1.0, day_index / 30) * rng.uniform(0.6, 0.9))
+    last_update = datetime.combine(report_date, datetime.min.time()) + timedelta(minutes=rng.randint(0, 23 * 60))
+    return {
+        "Province_State": province,
+        "Country_Region": country,
+        "Last_Update": last_update,
+        "Lat": latitude,
+        "Long_": longitude,
+        "Confirmed": confirmed,
+        "Deaths": deaths,
+        "Recovered": recovered,
+        "Active": confirmed - deaths - recovered,
+        "Incident_Rate": round(confirmed * 100_000 / population, 4),
+        "Case_Fatality_Ratio": round(deaths * 100 / confirmed, 4) if confirmed else None,
+    }
+
+
+def inject_noise(report, null_rate, negative_rate, rng):
+    # Blank out and negate values the way malformed upstream files do
+    for name in NUMERIC_COLUMNS:
+        if rng.random() < null_rate:
+            report[name] = None
+        elif rng.random() < negative_rate and report[name]:
+            report[name] = -report[name]
+    if rng.random() < null_rate / 5:
+        report["Country_Region"] = None
+    return report
+
+
+def to_layout(report, version):
+    """ Renders a canonical report as a row of the given layout version, in file column order
+    """
+    canonical_names = {name: version.renames.get(name, name) for name in version.schema.fieldNames()}
+    row = {}
+    for name, canonical_name in canonical_names.items():
+        value = report.get(canonical_name)
+        if canonical_name == "Last_Update":
+            value = LAST_UPDATE_FORMATS[version.version].format(d=value)
+        elif canonical_name == "Combined_Key":
+            value = ", ".join(part for part in (report["Province_State"], report["Country_Region"]) if part)
+        row[name] = value
+    return row
+
+
+def generate(output_dir, countries=20, provinces=5, days=60, start=date(2020, 1, 22), null_rate=0.01,
+             negative_rate=0.005, duplicate_rate=0.01, json_every=10, seed=42):
+    """ Writes one JHU-shaped daily report per day to output_dir, named MM-DD-YYYY.
+        The days are split into equal eras, one per layout version, to reproduce the schema drift.
+        Every `json_every`-th day is written as JSON instead of CSV, alternating JSON-lines and a JSON array.
+        Returns the number of rows and files written.
+    """
+    rng = random.Random(seed)
+    regions = make_regions(countries, provinces, rng)
+    os.makedirs(output_dir, exist_ok=True)
+
+    row_count = 0
+    for day_index in range(days):
+        report_date = start + timedelta(days=day_index)
+        version = SCHEMA_VERSIONS[min(day_index * len(SCHEMA_VERSIONS) // days, len(SCHEMA_VERSIONS) - 1)]
+
+        rows = []
+        for region in regions:
+            row = to_layout(inject_noise(region_report(region, day_index, report_date, rng), null_rate, negative_rate, rng), version)
+            rows.append(row)
+            if rng.random() < duplicate_rate:
+                rows.append(dict(row))
+        row_count += len(rows)
+
+        file_name = f"{report_date:%m-%d-%Y}"
+        if json_every and day_index % json_every == json_every - 1:
+            if (day_index // json_every) % 2 == 0:
+                with open(os.path.join(output_dir, f"{file_name}.jsonl"), "w") as report_file:
+                    report_file.writelines(json.dumps(row) + "\n" for row in rows)
+            else:
+                with open(os.path.join(output_dir, f"{file_name}.json"), "w") as report_file:
+                    json.dump(rows, report_file, indent=2)
+        else:
+            with open(os.path.join(output_dir, f"{file_name}.csv"), "w", newline="") as report_file:
+                writer = csv.DictWriter(report_file, fieldnames=version.schema.fieldNames())
+                writer.writeheader()
+                writer.writerows(rows)
+
+    return row_count, days
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic JHU-shaped COVID-19 daily reports")
+    parser.add_argument("output_dir")
+    parser.add_argument("--countries", type=int, default=20)
+    parser.add_argument("--provinces", type=int, default=5, help="reporting regions per country")
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2020, 1, 22))
+    parser.add_argument("--null-rate", type=float, default=0.01)
+    parser.add_argument("--negative-rate", type=float, default=0.005)
+    parser.add_argument("--duplicate-rate", type=float, default=0.01)
+    parser.add_argument("--json-every", type=int, default=10, help="write every n-th day as JSON, 0 for CSV only")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows, files = generate(
+        args.output_dir, args.countries, args.provinces, args.days, args.start, args.null_rate,
+        args.negative_rate, args.duplicate_rate, args.json_every, args.seed
+    )
+    print(f"Wrote {rows} rows in {files} files to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+from datetime import date, timedelta
+
+import pyarrow
+import pyarrow.parquet
+import pytest
+
+# The modules of the project are at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import query_backend
+from query_backend import ArrowBackend
+
+# Dates of the small warehouse: Wednesday January 22 through Sunday March 1, 2020
+FIRST_DATE = date(2020, 1, 22)
+DATES = [FIRST_DATE + timedelta(days=day) for day in range(40)]
+
+
+def write_table(warehouse, name, table, partition_cols=None):
+    # Laid out like a Hive table written by Spark: <database>.db/<table>/[date=.../]part files and a _SUCCESS marker
+    path = warehouse / "database_name.db" / name
+    path.mkdir(parents=True)
+    if partition_cols:
+        pyarrow.parquet.write_to_dataset(table, str(path), partition_cols=partition_cols)
+    else:
+        pyarrow.parquet.write_table(table, str(path / "part-00000.parquet"))
+    (path / "_SUCCESS").touch()
+
+
+@pytest.fixture
+def warehouse(tmp_path):
+    """ A Parquet warehouse with the serving tables and CovidData of three countries.
+        US (id 0) reports day * 2 cases on day number day, India (id 1) reports day cases, Italy (id 2) nothing.
+    """
+    write_table(tmp_path, "countrytotals", pyarrow.table({
+        "country_id": pyarrow.array([0, 1, 2], pyarrow.int32()),
+        "Name": ["US", "India", "Italy"],
+        "Total_Confirmed": [60, 30, 30],
+        "Total_Deaths": [3, 1, 1],
+        "Total_Recovered": [30, 15, 5],
+        "Total_Active": [27, 14, 24],
+    }))
+    write_table(tmp_path, "dailytotals", pyarrow.table({
+        "date": pyarrow.array(DATES, pyarrow.date32()),
+        "Total_Confirmed": [day * 3 for day in range(len(DATES))],
+        "Total_Deaths": [day for day in range(len(DATES))],
+        "Total_Recovered": [0] * len(DATES),
+    }))
+
+    rows = {"country_id": [], "Confirmed": [], "Deaths": [], "Recovered": [], "Active": [], "date": []}
+    for day, report_date in enumerate(DATES):
+        for country_id in (0, 1):
+            rows["country_id"].append(country_id)
+            rows["Confirmed"].append(day * (2 if country_id == 0 else 1))
+            rows["Deaths"].append(0)
+            rows["Recovered"].append(0)
+            rows["Active"].append(0)
+            rows["date"].append(report_date.isoformat())
+    covid_data = pyarrow.table(rows).cast(pyarrow.schema([
+        ("country_id", pyarrow.int32()), ("Confirmed", pyarrow.int32()), ("Deaths", pyarrow.int32()),
+        ("Recovered", pyarrow.int32()), ("Active", pyarrow.int32()), ("date", pyarrow.string()),
+    ]))
+    write_table(tmp_path, "coviddata", covid_data, partition_cols=["date"])
+    return tmp_path
+
+
+@pytest.fixture
+def arrow_backend(warehouse, monkeypatch):
+    # A fixed data version, so that the backend does not look up the published one
+    monkeypatch.setattr(query_backend, "current_data_version", lambda: "test")
+    return ArrowBackend(str(warehouse))
@@ -0,0 +1,61 @@
+from datetime import date
+
+import pyarrow
+
+from constants import COVID_DATA_TABLE
+from conftest import DATES
+
+
+def test_covid_data_date_partitions_are_read_as_dates(arrow_backend):
+    covid_data = arrow_backend.table(COVID_DATA_TABLE)
+    assert covid_data.schema.field("date").type == pyarrow.date32()
+    assert covid_data.num_rows == 2 * len(DATES)
+    assert min(covid_data["date"].to_pylist()) == DATES[0]
+
+
+def test_country_totals_filters_sorts_and_pages(arrow_backend):
+    def page(**kwargs):
+        arguments = dict(names=("US", "India", "Italy"), prefix="", order_by="Total_Confirmed", descending=True,
+                         limit=None, offset=0, columns=["Total_Confirmed"])
+        arguments.update(kwargs)
+        return arrow_backend.country_totals(**arguments).to_pydict()
+
+    # India and Italy tie on Total_Confirmed and are ordered by name
+    assert page() == {"Name": ["US", "India", "Italy"], "Total_Confirmed": [60, 30, 30]}
+    assert page(limit=2) == {"Name": ["US", "India"], "Total_Confirmed": [60, 30]}
+    assert page(offset=2, limit=2) == {"Name": ["Italy"], "Total_Confirmed": [30]}
+    assert page(descending=False, order_by="Name", columns=[]) == {"Name": ["India", "Italy", "US"]}
+    assert page(prefix="i", columns=["country_id"]) == {"Name": ["India", "Italy"], "country_id": [1, 2]}
+    assert page(names=("Italy",)) == {"Name": ["Italy"], "Total_Confirmed": [30]}
+
+
+def test_time_series_of_the_world_by_day(arrow_backend):
+    series = arrow_backend.time_series(date(2020, 1, 23), date(2020, 1, 25), "day", ()).to_pydict()
+    assert series["date"] == [date(2020, 1, 23), date(2020, 1, 24), date(2020, 1, 25)]
+    assert series["Total_Confirmed"] == [3, 6, 9]
+
+
+def test_time_series_of_countries_sums_their_reports(arrow_backend):
+    series = arrow_backend.time_series(None, date(2020, 1, 23), "day", (0, 1)).to_pydict()
+    assert series == {
+        "date": [date(2020, 1, 22), date(2020, 1, 23)],
+        "Total_Confirmed": [0, 3],
+        "Total_Deaths": [0, 0],
+        "Total_Recovered": [0, 0],
+    }
+    assert arrow_backend.time_series(None, date(2020, 1, 23), "day", (1,))["Total_Confirmed"].to_pylist() == [0, 1]
+
+
+def test_time_series_week_rollup_takes_the_last_day_of_each_week(arrow_backend):
+    series = arrow_backend.time_series(None, date(2020, 2, 2), "week", ()).to_pydict()
+    # Weeks start on Monday; the first one only has Wednesday 22 to Sunday 26 in the data
+    assert series["date"] == [date(2020, 1, 20), date(2020, 1, 27)]
+    # Values are cumulative: day numbers 4 (Sunday 26) and 11 (Sunday 2), times 3
+    assert series["Total_Confirmed"] == [12, 33]
+
+
+def test_time_series_month_rollup_of_countries(arrow_backend):
+    series = arrow_backend.time_series(None, None, "month", (1,)).to_pydict()
+    assert series["date"] == [date(2020, 1, 1), date(2020, 2, 1), date(2020, 3, 1)]
+    # India reports its day number: January 31 is day 9, February 29 day 38 and March 1 day 39
+    assert series["Total_Confirmed"] == [9, 38, 39]
@@ -0,0 +1,60 @@
+from result_cache import ResultCache
+
+
+class Counter:
+    # Query function stand-in that counts its calls
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_hits_do_not_recompute():
+    cache = ResultCache(2, lambda: "v1")
+    compute = Counter("result")
+    assert cache.get_or_compute("a", compute) == "result"
+    assert cache.get_or_compute("a", compute) == "result"
+    assert compute.calls == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(2, lambda: "v1")
+    a, b, c = Counter("a"), Counter("b"), Counter("c")
+    cache.get_or_compute("a", a)
+    cache.get_or_compute("b", b)
+    # Using a makes b the least recently used entry
+    cache.get_or_compute("a", a)
+    cache.get_or_compute("c", c)
+
+    cache.get_or_compute("a", a)
+    cache.get_or_compute("b", b)
+    assert (a.calls, b.calls, c.calls) == (1, 2, 1)
+
+
+def test_new_data_version_drops_every_entry():
+    versions = ["v1"]
+    cache = ResultCache(2, lambda: versions[0])
+    compute = Counter("result")
+    cache.get_or_compute("a", compute)
+    versions[0] = "v2"
+    cache.get_or_compute("a", compute)
+    assert compute.calls == 2
+
+
+def test_result_computed_while_the_version_moved_is_not_kept():
+    versions = ["v1"]
+    cache = ResultCache(2, lambda: versions[0])
+
+    def compute_during_load():
+        # The version changes while the query runs, as if ingestion published in the meantime
+        versions[0] = "v2"
+        cache.get_or_compute("other", lambda: None)
+        return "stale"
+
+    assert cache.get_or_compute("a", compute_during_load) == "stale"
+    fresh = Counter("fresh")
+    assert cache.get_or_compute("a", fresh) == "fresh"
+    assert fresh.calls == 1
@@ -0,0 +1,26 @@
+import pytest
+
+# The schemas are declared with pyspark types; no JVM is started
+pytest.importorskip("pyspark")
+
+from schemas import header_fingerprint, resolve_schema_version, SCHEMA_VERSIONS
+
+
+def test_header_fingerprint_strips_spaces_and_byte_order_mark():
+    assert header_fingerprint("\ufeffFIPS, Admin2 ,Province_State") == ("FIPS", "Admin2", "Province_State")
+
+
+def test_header_fingerprint_handles_quoted_names():
+    assert header_fingerprint('"Province/State","Country/Region",Last Update') == (
+        "Province/State", "Country/Region", "Last Update"
+    )
+
+
+def test_header_fingerprint_of_an_empty_line():
+    assert header_fingerprint("") == ()
+
+
+def test_every_declared_layout_resolves_to_itself():
+    for version in SCHEMA_VERSIONS:
+        header_line = ",".join(version.schema.fieldNames())
+        assert resolve_schema_version(header_line).version == version.version
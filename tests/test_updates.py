@@ -0,0 +1,43 @@
+from updates import snapshot_changes, server_sent_event
+
+ROW_KEYS = {"total_cases_by_country": "country", "total_cases_over_time": "date"}
+
+
+def snapshot(us_cases, dates, cases, global_cases=100):
+    return {
+        "total_cases": {"total_cases": global_cases},
+        "total_cases_by_country": {"country": ["US", "India"], "total_cases": [us_cases, 30]},
+        "total_cases_over_time": {"date": dates, "total_cases": cases},
+    }
+
+
+def test_nothing_changed():
+    previous = snapshot(60, ["2020-01-22"], [1])
+    assert snapshot_changes(previous, snapshot(60, ["2020-01-22"], [1]), ROW_KEYS) == {}
+
+
+def test_only_changed_countries_and_new_dates_are_sent():
+    previous = snapshot(60, ["2020-01-22"], [1])
+    current = snapshot(70, ["2020-01-22", "2020-01-23"], [1, 2], global_cases=110)
+    assert snapshot_changes(previous, current, ROW_KEYS) == {
+        "total_cases": {"total_cases": 110},
+        "total_cases_by_country": {"country": ["US"], "total_cases": [70]},
+        "total_cases_over_time": {"date": ["2020-01-23"], "total_cases": [2]},
+    }
+
+
+def test_changed_date_is_sent_again():
+    previous = snapshot(60, ["2020-01-22", "2020-01-23"], [1, 2])
+    current = snapshot(60, ["2020-01-22", "2020-01-23"], [1, 3])
+    assert snapshot_changes(previous, current, ROW_KEYS) == {
+        "total_cases_over_time": {"date": ["2020-01-23"], "total_cases": [3]},
+    }
+
+
+def test_part_missing_from_the_previous_snapshot_is_sent_whole():
+    current = snapshot(60, ["2020-01-22"], [1])
+    assert snapshot_changes({}, current, ROW_KEYS) == current
+
+
+def test_server_sent_event_format():
+    assert server_sent_event("update", {"a": 1}, "run-2") == 'event: update\nid: run-2\ndata: {"a": 1}\n\n'
@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+
+
+def table_rows(columns):
+    # {"column": [values]} as one {"column": value} dict per row
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def changed_rows(previous, current, key):
+    """ Rows of the column-oriented table current that are new or differ from previous, compared on the key column.
+        The result is column-oriented as well.
+    """
+    previous_rows = {row[key]: row for row in table_rows(previous)} if previous else {}
+    changed = [row for row in table_rows(current) if previous_rows.get(row[key]) != row]
+    return {name: [row[name] for row in changed] for name in current}
+
+
+def snapshot_changes(previous, current, row_keys):
+    """ What changed between two snapshots, by part: the new or changed rows of the tables named in row_keys,
+        and the whole payload of any other part that differs. Unchanged parts are left out.
+    """
+    changes = {}
+    for part, payload in current.items():
+        if part in row_keys:
+            rows = changed_rows(previous.get(part), payload, row_keys[part])
+            if rows[row_keys[part]]:
+                changes[part] = rows
+        elif previous.get(part) != payload:
+            changes[part] = payload
+    return changes
+
+
+def server_sent_event(event, data, event_id=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class UpdateFeed:
+    """ Pushes what changed in the API results to subscribed clients as Server-Sent Events
+        each time a new data version is published.
+        snapshot() returns the current results as {part: payload}; the parts named in row_keys are
+        column-oriented tables compared row by row on their key column, other parts are compared whole.
+        One watcher thread, started by the first subscription or by start(), polls version_source and computes the
+        changes once per version, however many clients are subscribed.
+    """
+
+    def __init__(self, snapshot, row_keys, version_source, poll_seconds, keepalive_seconds, max_subscribers):
+        self.snapshot = snapshot
+        self.row_keys = row_keys
+        self.version_source = version_source
+        self.poll_seconds = poll_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self.max_subscribers = max_subscribers
+        self._condition = threading.Condition()
+        self._version = None
+        self._snapshot = None
+        # (version it applies to, new version, changes) for the last version change
+        self._update = None
+        self._subscribers = 0
+        self._watcher = None
+
+    def _watch(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as error:
+                # e.g. nothing published yet; the next poll tries again
+                print(f"Update feed could not read the current results: {error}")
+            time.sleep(self.poll_seconds)
+
+    def start(self):
+        """ Starts the watcher thread, if it is not running yet
+        """
+        with self._condition:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name="update-feed", daemon=True)
+                self._watcher.start()
+
+    def poll(self):
+        """ Takes a new snapshot when the data version changed, and wakes up the subscribers
+        """
+        version = self.version_source()
+        if self._snapshot is not None and version == self._version:
+            return
+        snapshot = self.snapshot()
+        with self._condition:
+            if self._snapshot is not None:
+                self._update = (self._version, version, snapshot_changes(self._snapshot, snapshot, self.row_keys))
+            self._version, self._snapshot = version, snapshot
+            self._condition.notify_all()
+
+    def subscribe(self, last_version=None):
+        """ Returns the event stream of one client, or None when max_subscribers clients are already subscribed.
+            last_version is the version the client already has (the Last-Event-ID of a reconnecting EventSource).
+        """
+        with self._condition:
+            if self._subscribers >= self.max_subscribers:
+                return None
+            self._subscribers += 1
+        self.start()
+        return Subscription(self, self._events(last_version))
+
+    def _unsubscribe(self):
+        with self._condition:
+            self._subscribers -= 1
+
+    def _next_event(self, seen):
+        # The event that brings a client holding version seen up to date, or None after keepalive_seconds
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._snapshot is not None and self._version != seen, timeout=self.keepalive_seconds
+            )
+            if self._snapshot is None or self._version == seen:
+                return None
+            if seen is None:
+                # A new client: it loaded the current results itself, it only needs their version
+                return "version", self._version, {"version": self._version}
+            if self._update is not None and self._update[0] == seen:
+                return "update", self._update[1], self._update[2]
+            # Missed more than one version (or an unknown one): everything, once
+            return "snapshot", self._version, self._snapshot
+
+    def _events(self, last_version):
+        seen = last_version
+        while True:
+            event = self._next_event(seen)
+            if event is None:
+                # Comment line: keeps proxies from closing an idle connection, and lets a disconnect be noticed
+                yield ": keepalive\n\n"
+                continue
+            name, version, data = event
+            seen = version
+            yield server_sent_event(name, data, version)
+
+
+class Subscription:
+    """ Event stream of one client. Closing it (the WSGI server does when the client goes away)
+        frees its place among the subscribers.
+    """
+
+    def __init__(self, feed, events):
+        self.feed = feed
+        self.events = events
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.events)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.events.close()
+            self.feed._unsubscribe()